@@ -1,5 +1,9 @@
+from functools import lru_cache
+
 from django.contrib import admin
 from django import forms
+from django.db.models import Exists, F, OuterRef
+from django.db.models.signals import post_delete, post_save
 from django.utils import timezone
 from .models import (
     Customer,
@@ -13,7 +17,9 @@ from .models import (
     Trip,
     Assignment,
 )
-from .services import pricing_for_trip
+from .services import pricing_for_trip, pricing_for_trips
+from .tasks import refresh_trip_eta
+from .views import _bump_trip_list_version
 
 # --- Enkle registreringer ---
 admin.site.register(Customer)
@@ -48,6 +54,7 @@ class DriverAdmin(admin.ModelAdmin):
     list_display = ("id", "name", "phone", "active", "user")
     list_filter = ("active", )
     search_fields = ("name", "phone", "user__username")
+    list_select_related = ("user", )
 
 
 @admin.register(Vehicle)
@@ -57,6 +64,21 @@ class VehicleAdmin(admin.ModelAdmin):
     search_fields = ("name", "reg_no")
 
 
+# Delt på tvers av forms/formsets i prosessen — samme kunde spørres maks
+# én gang. Tømmes når prisplan-koblinger endres.
+@lru_cache(maxsize=1024)
+def _customer_has_plan(customer_id: int) -> bool:
+    return CustomerPricePlan.objects.filter(customer_id=customer_id).exists()
+
+
+def _clear_plan_cache(**kwargs):
+    _customer_has_plan.cache_clear()
+
+
+post_save.connect(_clear_plan_cache, sender=CustomerPricePlan)
+post_delete.connect(_clear_plan_cache, sender=CustomerPricePlan)
+
+
 # --- Trip admin form (din eksisterende logikk) ---
 class TripAdminForm(forms.ModelForm):
 
@@ -64,25 +86,41 @@ class TripAdminForm(forms.ModelForm):
         model = Trip
         fields = "__all__"
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Annoter plan-eksistens på kunde-valget, så clean()/save() kan lese
+        # den rett fra raden som allerede er hentet.
+        if "customer" in self.fields:
+            self.fields["customer"].queryset = Customer.objects.annotate(
+                has_plan=Exists(
+                    CustomerPricePlan.objects.filter(customer=OuterRef("pk"))))
+
+    def _customer_has_plan(self, customer):
+        # Kunden kommer normalt fra queryset-et over og har annotasjonen.
+        has_plan = getattr(customer, "has_plan", None)
+        if has_plan is not None:
+            return has_plan
+        return _customer_has_plan(customer.pk)
+
     def clean(self):
         cleaned = super().clean()
         customer = cleaned.get("customer")
         price = cleaned.get("price")
         # tillat manglende price kun hvis kunden har prisplan
+        self._needs_autopricing = False
         if price in (None, ""):
-            if not customer or not CustomerPricePlan.objects.filter(
-                    customer=customer).exists():
+            if not customer or not self._customer_has_plan(customer):
                 self.add_error(
                     "price", "Pris er påkrevd når kunden ikke har prisplan.")
+            else:
+                self._needs_autopricing = True
         return cleaned
 
     def save(self, commit=True):
         obj = super().save(commit=False)
         # beregn pris automatisk hvis den mangler, men prisplan finnes
-        if obj.price in (
-                None,
-                "") and obj.customer and CustomerPricePlan.objects.filter(
-                    customer=obj.customer).exists():
+        # (avgjort i clean() — ingen ny plan-spørring her)
+        if getattr(self, "_needs_autopricing", False):
             data = {
                 "date": obj.date,
                 "start_time": obj.start_time,
@@ -113,7 +151,7 @@ class TripAdmin(admin.ModelAdmin):
         "status",
         "invoiced",
         "invoiced_at",
-        "invoiced_by",
+        "invoiced_by_name",
         "flight_number",
         "po_number",
     )
@@ -124,10 +162,71 @@ class TripAdmin(admin.ModelAdmin):
         "customer",
     )
     search_fields = ("id", "customer__name", "flight_number", "po_number")
+    # Unngå N+1 når changelist rendrer FK-kolonnene.
+    list_select_related = ("customer", "invoiced_by")
 
     # Vi lar admin redigere 'invoiced', men holder 'invoiced_at/by' readonly.
     readonly_fields = ("invoiced_at", "invoiced_by")
 
+    actions = ["recompute_prices", "mark_invoiced", "unmark_invoiced"]
+
+    @admin.action(description="Marker som fakturert")
+    def mark_invoiced(self, request, queryset):
+        # Én UPDATE for hele utvalget i stedet for save_model per rad.
+        updated = queryset.update(invoiced=True,
+                                  invoiced_at=timezone.now(),
+                                  invoiced_by=request.user)
+        # queryset.update() utløser ikke signaler — invalider API-lista
+        _bump_trip_list_version()
+        self.message_user(request, f"Markerte {updated} turer som fakturert.")
+
+    @admin.action(description="Fjern fakturert-markering")
+    def unmark_invoiced(self, request, queryset):
+        updated = queryset.update(invoiced=False,
+                                  invoiced_at=None,
+                                  invoiced_by=None)
+        _bump_trip_list_version()
+        self.message_user(request,
+                          f"Fjernet fakturert-markering på {updated} turer.")
+
+    @admin.action(description="Beregn pris på nytt")
+    def recompute_prices(self, request, queryset):
+        # Batch: to oppslag (prisplaner + helligdager) og én UPDATE,
+        # i stedet for et par spørringer per tur.
+        trips = list(queryset)
+        batch = [{
+            "date": t.date,
+            "start_time": t.start_time,
+            "pax": t.pax,
+            "customer": t.customer,
+            "origin_location": t.origin_location,
+            "destination_location": t.destination_location,
+            "stop1_location": t.stop1_location,
+            "stop2_location": t.stop2_location,
+        } for t in trips]
+        for trip, price in zip(trips, pricing_for_trips(batch)):
+            trip.price = price
+        Trip.objects.bulk_update(trips, ["price"], batch_size=1000)
+        # bulk_update utløser heller ikke signaler
+        _bump_trip_list_version()
+        self.message_user(request, f"Oppdaterte pris på {len(trips)} turer.")
+
+    def get_queryset(self, request):
+        # Location-FK-ene trengs av pricing_for_trip ved lagring;
+        # hent alt i én JOIN i stedet for lazy-loads per rad.
+        qs = super().get_queryset(request)
+        # invoiced_by_name: kolonnen ligger allerede i JOIN-en — slipp å
+        # instansiere User bare for __str__ i changelist.
+        return qs.select_related("customer", "invoiced_by", "origin_location",
+                                 "destination_location", "stop1_location",
+                                 "stop2_location").annotate(
+                                     invoiced_by_name=F(
+                                         "invoiced_by__username"))
+
+    @admin.display(description="Fakturert av", ordering="invoiced_by__username")
+    def invoiced_by_name(self, obj):
+        return obj.invoiced_by_name
+
     def save_model(self, request, obj, form, change):
         """
         Hvis 'invoiced' endres i admin:
@@ -142,3 +241,7 @@ class TripAdmin(admin.ModelAdmin):
                 obj.invoiced_at = None
                 obj.invoiced_by = None
         super().save_model(request, obj, form, change)
+        # Varm ETA-cachen i bakgrunnen når flightnr endres — ikke blokker
+        # admin-tråden på Avinor.
+        if obj.flight_number and "flight_number" in form.changed_data:
+            refresh_trip_eta(obj.flight_number, obj.date.isoformat())
@@ -0,0 +1,43 @@
+# api/fast_serializers.py
+"""
+Lettvekts-serialisering for Trip-lista.
+
+DRF's ModelSerializer betaler felt-kopiering, bind og metode-dispatch per
+rad — på store GET-lister er håndrullede dict-literals flere ganger
+raskere. Samme idé som serpy, men uten ekstra avhengighet. Formen på
+output matcher TripSerializer, så frontend merker ingen forskjell.
+"""
+from typing import Any, Dict
+
+from .models import Trip
+
+_STATUS_LABELS = dict(Trip.STATUS_CHOICES)
+
+# Kolonnene list-endepunktet trenger fra .values() — inkluderer JOIN-ede
+# sjåfør-/fakturafelter så hele raden kommer i én spørring.
+TRIP_LIST_COLUMNS = (
+    "id", "date", "start_time", "duration_min", "origin_location",
+    "destination_location", "stop1_location", "stop2_location", "customer",
+    "pax", "price", "status", "comment", "exception_note", "vehicle",
+    "created_at", "flight_number", "po_number", "invoiced", "invoiced_at",
+    "invoiced_by", "invoiced_by__username", "assignment__driver_id",
+    "assignment__driver__name", "assignment__driver__user__username")
+
+
+def trip_row_to_dict(r: Dict[str, Any]) -> Dict[str, Any]:
+    """Omform en .values()-rad (TRIP_LIST_COLUMNS) til TripSerializer-form."""
+    drv_id = r.pop("assignment__driver_id")
+    drv_name = r.pop("assignment__driver__name")
+    drv_username = r.pop("assignment__driver__user__username")
+    inv_id = r["invoiced_by"]
+    inv_username = r.pop("invoiced_by__username")
+    r["status"] = _STATUS_LABELS.get(r["status"], r["status"])
+    r["current_driver"] = ({
+        "id": drv_id,
+        "name": drv_name or drv_username or str(drv_id),
+    } if drv_id is not None else None)
+    r["invoiced_by"] = ({
+        "id": inv_id,
+        "username": inv_username,
+    } if inv_id is not None else None)
+    return r
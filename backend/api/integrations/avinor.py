@@ -1,17 +1,56 @@
 # apps/transport/integrations/avinor.py
 from __future__ import annotations
 import datetime as dt
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, NamedTuple, Optional
 import re
 import requests
+from django.core.cache import cache
 from django.utils import timezone
 
+try:
+    # C-basert JSON-parser — merkbart raskere på store ankomstlister
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
 AVINOR_BASE = "https://api.avinor.no/FlightTimetable"
 
+# Gjenbruk TCP/TLS-forbindelsen mellom kall (keep-alive) i stedet for å
+# betale handshake per request. Faste headere settes én gang på session.
+_SESSION = requests.Session()
+_SESSION.headers.update({"User-Agent": "transport-backend/1.0"})
+_SESSION.mount(
+    "https://",
+    requests.adapters.HTTPAdapter(
+        pool_connections=10,
+        pool_maxsize=20,
+        max_retries=requests.adapters.Retry(total=2,
+                                            backoff_factor=0.2,
+                                            status_forcelist=(502, 503,
+                                                              504))))
+
+# Kort TTL: nok til at mange oppslag på samme dato deler én nedlasting,
+# uten at ETA-ene rekker å bli nevneverdig gamle.
+ARRIVALS_CACHE_TTL = 60  # sekunder
+
+
+_FLIGHT_RE = re.compile(r"[^A-Z0-9]")
+
 
 def _norm_flight(s: str) -> str:
     # "DY 540" -> "DY540", "dy-540" -> "DY540"
-    return re.sub(r"[^A-Z0-9]", "", (s or "").upper())
+    return _FLIGHT_RE.sub("", (s or "").upper())
+
+
+def _parse_iso(s: Optional[str]) -> Optional[dt.datetime]:
+    if not s:
+        return None
+    try:
+        # Avinor gir ofte lokal tid uten Z — tolk som naive lokal og konverter til aware
+        # men vi trenger bare sortering; naive funker også
+        return dt.datetime.fromisoformat(s)
+    except Exception:
+        return None
 
 
 def _today_oslo_str() -> str:
@@ -27,90 +66,110 @@ def fetch_arrivals_svg(date_str: Optional[str] = None) -> List[Dict[str, Any]]:
     GET https://api.avinor.no/FlightTimetable?airport=SVG&direction=Arrival&date=YYYY-MM-DD
     """
     date_s = (date_str or _today_oslo_str())
+    key = f"avinor:SVG:{date_s}"
+    hit = cache.get(key)
+    if hit is not None:
+        return hit
     params = {"airport": "SVG", "direction": "Arrival", "date": date_s}
-    r = requests.get(AVINOR_BASE, params=params, timeout=15)
+    r = _SESSION.get(AVINOR_BASE, params=params, timeout=15)
     r.raise_for_status()
-    j = r.json()
+    j = orjson.loads(r.content) if orjson else r.json()
     # Avinor svarer normalt med en liste av flights
-    return j if isinstance(
+    flights = j if isinstance(
         j, list) else j.get("flights", []) or j.get("result", []) or []
+    cache.set(key, flights, ARRIVALS_CACHE_TTL)
+    return flights
+
+
+def _arrivals_index(date_str: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Bygg (og cache) en indeks {normalisert flightnr -> [flights]} for én dato,
+    inkludert codeshares. Gjør flightnr-oppslag O(1) i stedet for å skanne
+    hele ankomstlisten per kall.
+    """
+    date_s = (date_str or _today_oslo_str())
+    key = f"avinor:SVG:idx:{date_s}"
+    idx = cache.get(key)
+    if idx is not None:
+        return idx
+
+    idx = {}
+    for f in fetch_arrivals_svg(date_s):
+        # Pre-parse ETA én gang per fetch, så hvert oppslag slipper å
+        # parse ISO-strenger på nytt.
+        f["_eta_sort_key"] = (_parse_iso(f.get("estimatedTime"))
+                              or _parse_iso(f.get("scheduleTime"))
+                              or dt.datetime.max)
+        fid = _norm_flight(str(f.get("flightId") or ""))
+        if fid:
+            idx.setdefault(fid, []).append(f)
+        # noen payloads har "codeShares" som liste over iata-strings
+        shares = f.get("codeShares") or f.get("codeshares") or []
+        try:
+            for s in shares:
+                n = _norm_flight(str(s))
+                if n:
+                    idx.setdefault(n, []).append(f)
+        except Exception:
+            pass
+    cache.set(key, idx, ARRIVALS_CACHE_TTL)
+    return idx
+
+
+class FlightInfo(NamedTuple):
+    """Lettvekts-projeksjon av en Avinor-flight (tuple i stedet for dict —
+    billigere i bulk-oppslag; kall ._asdict() om du trenger dict)."""
+    flight: Optional[str]
+    airline: Optional[str]
+    origin_iata: Optional[str]
+    dest_iata: str
+    scheduled: Optional[str]
+    estimated: Optional[str]
+    status: Optional[str]
+    gate: Optional[str]
+    baggage: Optional[str]
+    raw: Optional[Dict[str, Any]] = None  # nyttig ved feil; kan fjernes
+
+
+def _project(best: Dict[str, Any]) -> FlightInfo:
+    # felt-navn kan variere – vi er defensive
+    return FlightInfo(
+        flight=best.get("flightId"),
+        airline=best.get("airline") or best.get("carrier"),
+        origin_iata=best.get("airportFrom") or best.get("origin")
+        or best.get("fromIata"),
+        dest_iata="SVG",
+        scheduled=best.get("scheduleTime"),
+        estimated=best.get("estimatedTime") or best.get("statusTime"),
+        status=best.get("status") or best.get("remarks"),
+        gate=best.get("gate"),
+        baggage=best.get("baggage"),
+        raw=best,
+    )
 
 
 def find_eta_svg_by_flight(
         number: str,
-        date_str: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        date_str: Optional[str] = None) -> Optional[FlightInfo]:
     """
     Returner en 'best match' flight for gitt flightnummer (IATA), inkludert forventet/planlagt ankomst.
     """
-    flights = fetch_arrivals_svg(date_str)
     needle = _norm_flight(number)
+    exact = _arrivals_index(date_str).get(needle, [])
 
-    # 1) eksakt treff på flightId
-    exact = [
-        f for f in flights if _norm_flight(str(f.get("flightId"))) == needle
-    ]
-
-    # 2) se i ev. codeshares dersom Avinor eksponerer det (varierer litt)
-    if not exact:
-        cand = []
-        for f in flights:
-            # noen payloads har "codeShares" som liste over iata-strings
-            shares = f.get("codeShares") or f.get("codeshares") or []
-            try:
-                for s in shares:
-                    if _norm_flight(str(s)) == needle:
-                        cand.append(f)
-                        break
-            except Exception:
-                pass
-        exact = cand
-
-    # 3) hvis flere – velg den nærmest nå (på estimert/planlagt ankomst)
+    # hvis flere – velg den nærmest nå (på estimert/planlagt ankomst)
     if not exact:
         return None
 
-    def _parse(s: Optional[str]) -> Optional[dt.datetime]:
-        if not s:
-            return None
-        try:
-            # Avinor gir ofte lokal tid uten Z — tolk som naive lokal og konverter til aware
-            # men vi trenger bare sortering; naive funker også
-            return dt.datetime.fromisoformat(s)
-        except Exception:
-            return None
+    def _eta_key(f: Dict[str, Any]):
+        # satt i _arrivals_index; fallback for rader uten pre-parsing
+        key = f.get("_eta_sort_key")
+        if key is None:
+            key = (_parse_iso(f.get("estimatedTime"))
+                   or _parse_iso(f.get("scheduleTime")) or dt.datetime.max)
+        return key
 
-    now = timezone.localtime()
+    # min() holder: O(N) uten å allokere en sortert liste vi kaster uansett
+    best = min(exact, key=_eta_key)
 
-    def _eta_key(f: Dict[str, Any]):
-        eta = _parse(f.get("estimatedTime")) or _parse(f.get("scheduleTime"))
-        if eta is None:
-            return dt.datetime.max
-        # anta at dette er lokal Oslo-tid; sammenlign som naive:
-        return eta
-
-    exact.sort(key=_eta_key)
-    best = exact[0]
-
-    # pakk ut nyttige felter (felt-navn kan variere – vi er defensive)
-    return {
-        "flight":
-        best.get("flightId"),
-        "airline":
-        best.get("airline") or best.get("carrier"),
-        "origin_iata":
-        best.get("airportFrom") or best.get("origin") or best.get("fromIata"),
-        "dest_iata":
-        "SVG",
-        "scheduled":
-        best.get("scheduleTime"),
-        "estimated":
-        best.get("estimatedTime") or best.get("statusTime"),
-        "status":
-        best.get("status") or best.get("remarks"),
-        "gate":
-        best.get("gate"),
-        "baggage":
-        best.get("baggage"),
-        "raw":
-        best,  # nyttig ved feil; kan fjernes om du vil
-    }
+    return _project(best)
@@ -17,21 +17,58 @@ Hva som er tilgjengelig avhenger av plan. Behandle 403/404 som 'ikke tilgjengeli
 from __future__ import annotations
 
 import datetime as dt
+import functools
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Any, Dict, List, Optional, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter, Retry
 from django.conf import settings
+from django.core.cache import cache
+
+try:
+    # C-basert JSON-parser — merkbart raskere på store live-payloads
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def _loads_response(r: requests.Response) -> Any:
+    return orjson.loads(r.content) if orjson else r.json()
 
 # === Konfig ===
 FR24_API_BASE: str = getattr(settings, "FR24_API_BASE",
                              "https://fr24api.flightradar24.com/api")
+
+# Gjenbruk TCP/TLS-forbindelsen mellom kall (keep-alive) i stedet for å
+# betale handshake per request. Faste headere settes én gang på session;
+# auth/versjon merges inn per kall via _headers().
+_SESSION = requests.Session()
+_SESSION.headers.update({
+    "Accept": "application/json",
+    "User-Agent": "transport-backend/1.0",
+})
+_SESSION.mount(
+    "https://",
+    HTTPAdapter(pool_connections=4,
+                pool_maxsize=16,
+                max_retries=Retry(total=2,
+                                  backoff_factor=0.3,
+                                  status_forcelist=(502, 503, 504))))
 FR24_API_TOKEN: Optional[str] = getattr(settings, "FR24_API_TOKEN", None)
 FR24_AUTH_SCHEME: str = getattr(settings, "FR24_AUTH_SCHEME",
                                 "bearer")  # "bearer" | "x-api-key"
 FR24_ACCEPT_VERSION: Optional[str] = getattr(settings, "FR24_ACCEPT_VERSION",
                                              "v1")
 
+# Kort TTL på rene GET-oppslag: UI-polling og flere brukere på samme
+# flyplass deler én FR24-rundtur i stedet for å spise kvote hver for seg.
+# Ankomsttavla tåler 30s staleness; summary er historiske data og tåler mer.
+ARRIVALS_CACHE_TTL = 30  # sekunder
+SUMMARY_CACHE_TTL = 300  # sekunder
+
 # Summary (valgfritt – kan gi 404 hvis ikke i din plan)
 FR24_FLIGHT_SUMMARY_PATH: str = getattr(settings, "FR24_FLIGHT_SUMMARY_PATH",
                                         "/flight-summary")
@@ -41,53 +78,78 @@ FR24_FLIGHT_SUMMARY_VARIANT: str = getattr(settings,
 
 # IATA -> tillatte prefikser for flight (IATA) og callsign (ICAO).
 # Vi tillater også at enkelte feeder bruker IATA i callsign-feltet ved å legge iata i "icao"-listen senere.
-AIRLINE_ALIASES: Dict[str, List[str]] = {
+# Tupler (immutable) — kan refereres direkte i hot path uten .copy()
+AIRLINE_ALIASES: Dict[str, Tuple[str, ...]] = {
     # Nordics / vanlige hos deg
-    "DY": ["NOZ", "NSZ", "NAX"],  # Norwegian
-    "SK": ["SAS", "SZS"],  # SAS (+ "SZS" observert i noen feeder)
-    "LH": ["DLH"],  # Lufthansa
-    "WF": ["WIF"],  # Widerøe
-    "KL": ["KLM"],  # KLM
-    "BA": ["BAW"],  # British Airways
-    "AF": ["AFR"],  # Air France
-    "TK": ["THY"],  # Turkish
-    "AY": ["FIN"],  # Finnair
-    "LX": ["SWR"],  # Swiss
-    "OS": ["AUA"],  # Austrian
-    "SN": ["BEL"],  # Brussels
-    "LO": ["LOT"],  # LOT
-    "IB": ["IBE"],  # Iberia
-    "EI": ["EIN"],  # Aer Lingus
-    "AZ": ["ITY", "AZA"],  # ITA / Alitalia
-    "UA": ["UAL"],  # United
-    "AA": ["AAL"],  # American
-    "DL": ["DAL"],  # Delta
-    "QR": ["QTR"],  # Qatar
-    "EK": ["UAE"],  # Emirates
-    "SU": ["AFL"],  # Aeroflot
-    "RJ": ["RJA"],  # Royal Jordanian
-    "HV": ["TRA"],  # Transavia
-    "TO": ["TVF"],  # Transavia France
-    "FR": ["RYR", "MAY"],  # Ryanair (MAY sett i enkelte feeds)
-    "XQ": ["SXS"],  # SunExpress
-    "T7": ["T7M"],  # Private (observasjoner)
+    "DY": ("NOZ", "NSZ", "NAX"),  # Norwegian
+    "SK": ("SAS", "SZS"),  # SAS (+ "SZS" observert i noen feeder)
+    "LH": ("DLH",),  # Lufthansa
+    "WF": ("WIF",),  # Widerøe
+    "KL": ("KLM",),  # KLM
+    "BA": ("BAW",),  # British Airways
+    "AF": ("AFR",),  # Air France
+    "TK": ("THY",),  # Turkish
+    "AY": ("FIN",),  # Finnair
+    "LX": ("SWR",),  # Swiss
+    "OS": ("AUA",),  # Austrian
+    "SN": ("BEL",),  # Brussels
+    "LO": ("LOT",),  # LOT
+    "IB": ("IBE",),  # Iberia
+    "EI": ("EIN",),  # Aer Lingus
+    "AZ": ("ITY", "AZA"),  # ITA / Alitalia
+    "UA": ("UAL",),  # United
+    "AA": ("AAL",),  # American
+    "DL": ("DAL",),  # Delta
+    "QR": ("QTR",),  # Qatar
+    "EK": ("UAE",),  # Emirates
+    "SU": ("AFL",),  # Aeroflot
+    "RJ": ("RJA",),  # Royal Jordanian
+    "HV": ("TRA",),  # Transavia
+    "TO": ("TVF",),  # Transavia France
+    "FR": ("RYR", "MAY"),  # Ryanair (MAY sett i enkelte feeds)
+    "XQ": ("SXS",),  # SunExpress
+    "T7": ("T7M",),  # Private (observasjoner)
     # legg til flere etter behov
 }
 
+# Omvendt indeks for O(1)-oppslag ICAO -> IATA (bygges én gang ved import)
+_ICAO_TO_IATA: Dict[str, str] = {
+    icao: iata
+    for iata, icaos in AIRLINE_ALIASES.items() for icao in icaos
+}
+
 # Regex for callsign (ICAO + nummer/suffiks), f.eks. SAS4612, DLH5UJ, NOZ2889A
 _CALLSIGN_RE = re.compile(r"^[A-Z]{3}[0-9A-Z]{1,5}$")
 
+# Kompilert én gang — disse kjøres per item i filter-løkkene.
+_NORM_FLIGHT_RE = re.compile(r"[^A-Z0-9]")
+_IATA_NUM_RE = re.compile(r"^([A-Z]{2})([0-9]{1,4}[A-Z]?)$")
+_AIRLINE_PREFIX_RE = re.compile(r"^([A-Z]+)")
+_NON_DIGIT_RE = re.compile(r"\D")
+
 
 def looks_like_callsign(s: str) -> bool:
     return bool(_CALLSIGN_RE.match((s or "").strip().upper().replace(" ", "")))
 
 
+def _looks_like_callsign_normed(s: str) -> bool:
+    # variant for input som allerede er normalisert via _norm() — slipper
+    # tre string-allokeringer i hot path
+    return bool(_CALLSIGN_RE.match(s))
+
+
+# fjerner all whitespace i én C-pass i stedet for strip()+replace()
+_WS_TRANS_TABLE = str.maketrans("", "", " \t\n\r")
+
+
 def _norm(s: str) -> str:
-    return (s or "").strip().upper().replace(" ", "")
+    return (s or "").translate(_WS_TRANS_TABLE).upper()
 
 
 def _digits(s: str) -> str:
-    return "".join(ch for ch in (s or "") if ch.isdigit())
+    # regex-sub kjører hele ekstraksjonen i C — raskere enn generator+join
+    # (FR24-flightnr er ren ASCII, så \D vs isdigit() spiller ingen rolle)
+    return _NON_DIGIT_RE.sub("", s or "")
 
 
 def filter_by_callsign(items: List[dict], query: str) -> List[dict]:
@@ -106,32 +168,58 @@ def live_positions_multi(bounds_list: List[str],
                          limit: int = 500) -> List[Dict[str, Any]]:
     """
     Hent live-positions for flere bounds og slå sammen unike rader (på fr24_id eller fallback-nøkkel).
+    Kallene er uavhengige HTTP-rundturer og gjøres parallelt — total ventetid
+    blir ~én rundtur i stedet for summen av alle.
     """
-    seen = set()
+    # separate sett: streng-hash for fr24_id er billigere enn tuple-hash,
+    # og fallback-tuppelen bygges kun for rader uten id
+    seen_ids: set = set()
+    seen_fallback: set = set()
     out: List[Dict[str, Any]] = []
-    for b in bounds_list:
-        try:
-            items = live_positions(bounds=b, maxage=maxage, limit=limit)
-        except Exception:
-            items = []
-        for it in items:
-            key = it.get("fr24_id") or (it.get("flight"), it.get("callsign"),
-                                        it.get("timestamp"))
-            if key in seen:
-                continue
-            seen.add(key)
-            out.append(it)
+    if not bounds_list:
+        return out
+    # lokale alias sparer attributt-oppslag i den indre løkka
+    seen_ids_add = seen_ids.add
+    seen_fallback_add = seen_fallback.add
+    out_append = out.append
+    with ThreadPoolExecutor(max_workers=min(8, len(bounds_list))) as ex:
+        futures = [
+            ex.submit(live_positions, bounds=b, maxage=maxage, limit=limit)
+            for b in bounds_list
+        ]
+        for fut in as_completed(futures):
+            try:
+                items = fut.result()
+            except Exception:
+                items = []
+            for it in items:
+                # fr24_id finnes nesten alltid — bruk strengen direkte som
+                # nøkkel og bygg fallback-tuppelen kun når den mangler.
+                fid = it.get("fr24_id")
+                if fid is not None:
+                    if fid in seen_ids:
+                        continue
+                    seen_ids_add(fid)
+                else:
+                    key = (it.get("flight"), it.get("callsign"),
+                           it.get("timestamp"))
+                    if key in seen_fallback:
+                        continue
+                    seen_fallback_add(key)
+                out_append(it)
     return out
 
 
 # === Intern hjelp ===
+@functools.lru_cache(maxsize=1)
 def _headers() -> Dict[str, str]:
+    # Konfigen er modul-konstant, så dicten bygges én gang. requests kopierer
+    # headers internt, så å returnere samme referanse er trygt. (lru_cache
+    # cacher ikke exceptions, så manglende token prøves på nytt per kall.)
     if not FR24_API_TOKEN:
         raise RuntimeError("FR24_API_TOKEN is not set")
-    h = {
-        "Accept": "application/json",
-        "User-Agent": "transport-backend/1.0",
-    }
+    # Accept/User-Agent ligger som defaults på _SESSION; her kun auth/versjon.
+    h = {}
     if FR24_ACCEPT_VERSION:
         h["Accept-Version"] = FR24_ACCEPT_VERSION
     if FR24_AUTH_SCHEME.lower() == "x-api-key":
@@ -166,9 +254,129 @@ def _dig(dct: Any, *paths: str) -> Any:
     return None
 
 
+def _dig_paths(dct: Any, *paths: Tuple[str, ...]) -> Any:
+    """
+    Som _dig, men med ferdig-splittede path-tupler — slipper str.split
+    på de samme literalene for hvert eneste item i normaliseringsløkkene.
+    """
+    for tup in paths:
+        cur = dct
+        for part in tup:
+            if isinstance(cur, dict) and part in cur:
+                cur = cur[part]
+            else:
+                cur = None
+                break
+        if cur not in (None, ""):
+            return cur
+    return None
+
+
+def _split_paths(*paths: str) -> Tuple[Tuple[str, ...], ...]:
+    return tuple(tuple(p.split(".")) for p in paths)
+
+
+# Nøkkelnavn ulike FR24-endepunkt/planer bruker for selve rad-listen
+_LIST_KEYS = ("arrivals", "data", "result", "results", "flights", "items",
+              "records", "rows", "features", "aircraft")
+
+
+def _find_items_list(j: Any) -> List[Dict[str, Any]]:
+    """Finn listen med rader i et FR24-svar, uansett nøkkelnavn."""
+    if isinstance(j, list):
+        return j
+    if isinstance(j, dict):
+        key = next((k for k in _LIST_KEYS if isinstance(j.get(k), list)),
+                   None)
+        if key is not None:
+            return j[key]
+    return []
+
+
+# Path-konstanter for live_positions-normaliseringen
+_LIVE_FLIGHT = _split_paths("flight", "callsign", "ident", "label")
+_LIVE_CALLSIGN = _split_paths("callsign", "label")
+_LIVE_REG = _split_paths("reg", "registration", "aircraft.registration")
+_LIVE_LAT = _split_paths("lat", "latitude", "position.lat", "trail.0.lat")
+_LIVE_LON = _split_paths("lon", "longitude", "position.lon", "trail.0.lon")
+_LIVE_ALT = _split_paths("alt", "baro_altitude", "altitude")
+_LIVE_SPD = _split_paths("speed", "ground_speed", "gs", "gspeed")
+_LIVE_TRACK = _split_paths("track", "heading")
+_LIVE_SQUAWK = _split_paths("squawk")
+_LIVE_TS = _split_paths("timestamp")
+_LIVE_ETA = _split_paths("eta")
+_LIVE_ORIG = _split_paths("orig_iata", "origin.iata",
+                          "airport.origin.code.iata")
+_LIVE_DEST = _split_paths("dest_iata", "destination.iata",
+                          "airport.destination.code.iata")
+_LIVE_ID = _split_paths("fr24_id", "id", "flight_id")
+_LIVE_PAINTED = _split_paths("painted_as")
+_LIVE_OPER = _split_paths("operating_as")
+
+# Path-konstanter for airport_arrivals-normaliseringen
+_ARR_FLIGHT = _split_paths("flight", "flight_iata", "callsign", "ident",
+                           "label")
+_ARR_CALLSIGN = _split_paths("callsign", "ident", "label")
+_ARR_ORIG = _split_paths("origin.iata", "orig_iata",
+                         "airport.origin.code.iata", "origin.code")
+_ARR_DEST = _split_paths("destination.iata", "dest_iata",
+                         "airport.destination.code.iata", "destination.code")
+_ARR_ETA = _split_paths("arrival.estimated", "times.estimated.arrival", "eta",
+                        "est_arrival_time")
+_ARR_SCHED = _split_paths("arrival.scheduled", "times.scheduled.arrival",
+                          "schedule_time")
+_ARR_STATUS = _split_paths("status", "operation.status", "status.code")
+
+
+# ETag/Last-Modified per (path, params) — ved polling svarer FR24 304 når
+# ingenting er endret, og vi slipper både payload-overføring og JSON-parse.
+_COND_CACHE: Dict[tuple, tuple] = {}
+_COND_LOCK = threading.Lock()
+
+
+def _conditional_get(path: str,
+                     params: Dict[str, Any],
+                     timeout: int = 15) -> Tuple[requests.Response, Any]:
+    """
+    GET med betinget revalidering. Returnerer (response, parsed_json);
+    ved 304 gjenbrukes sist parsede payload, ved >=400 er json None.
+    """
+    key = (path, tuple(sorted(params.items())))
+    with _COND_LOCK:
+        cached = _COND_CACHE.get(key)
+
+    headers = _headers()
+    if cached:
+        etag, last_mod, _ = cached
+        headers = dict(headers)  # ikke muter den lru_cache-ede dicten
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_mod:
+            headers["If-Modified-Since"] = last_mod
+
+    r = _SESSION.get(FR24_API_BASE + path,
+                     headers=headers,
+                     params=params,
+                     timeout=timeout)
+    if r.status_code == 304 and cached:
+        return r, cached[2]
+    if r.status_code >= 400:
+        return r, None
+
+    j = _loads_response(r)
+    etag = r.headers.get("ETag")
+    last_mod = r.headers.get("Last-Modified")
+    if etag or last_mod:
+        with _COND_LOCK:
+            if len(_COND_CACHE) > 128:
+                _COND_CACHE.clear()
+            _COND_CACHE[key] = (etag, last_mod, j)
+    return r, j
+
+
 def _norm_flight_no(s: str) -> str:
     """Normaliser flightnr til [A-Z0-9] (fjerner mellomrom, bindestrek osv.)."""
-    return re.sub(r"[^A-Z0-9]", "", (s or "").upper())
+    return _NORM_FLIGHT_RE.sub("", (s or "").upper())
 
 
 # === LIVE: Flight positions ===
@@ -193,50 +401,34 @@ def live_positions(
         "limit": limit,
         "format": "json",
     }
-    r = requests.get(FR24_API_BASE + path,
-                     headers=_headers(),
-                     params=params,
-                     timeout=15)
+    r, j = _conditional_get(path, params)
     r.raise_for_status()
-    j = r.json()
 
     if return_raw:
         # Returner rå JSON fra FR24 for debugging
         return j  # type: ignore[return-value]
 
     # Finn liste som inneholder flyene – tillat ulike nøkkelnavn
-    items: List[Dict[str, Any]] = []
-    if isinstance(j, list):
-        items = j  # sjelden, men støttes
-    elif isinstance(j, dict):
-        for key in ("data", "result", "results", "flights", "items", "records",
-                    "rows", "features"):
-            v = j.get(key)
-            if isinstance(v, list):
-                items = v  # type: ignore[assignment]
-                break
-        if not items and isinstance(j.get("aircraft"), list):
-            items = j["aircraft"]  # type: ignore[assignment]
+    items = _find_items_list(j)
 
     out: List[Dict[str, Any]] = []
     for it in items:
-        flight = _dig(it, "flight", "callsign", "ident", "label")
-        callsign = _dig(it, "callsign", "label")
-        reg = _dig(it, "reg", "registration", "aircraft.registration")
-        lat = _dig(it, "lat", "latitude", "position.lat", "trail.0.lat")
-        lon = _dig(it, "lon", "longitude", "position.lon", "trail.0.lon")
-        alt = _dig(it, "alt", "baro_altitude", "altitude")
-        spd = _dig(it, "speed", "ground_speed", "gs", "gspeed")
-        track = _dig(it, "track", "heading")
-        squawk = _dig(it, "squawk")
-        ts = _dig(it, "timestamp")
-        eta = _dig(it, "eta")
-        orig = _dig(it, "orig_iata", "origin.iata", "airport.origin.code.iata")
-        dest = _dig(it, "dest_iata", "destination.iata",
-                    "airport.destination.code.iata")
-        frid = _dig(it, "fr24_id", "id", "flight_id")
-        painted = _dig(it, "painted_as")
-        oper = _dig(it, "operating_as")
+        flight = _dig_paths(it, *_LIVE_FLIGHT)
+        callsign = _dig_paths(it, *_LIVE_CALLSIGN)
+        reg = _dig_paths(it, *_LIVE_REG)
+        lat = _dig_paths(it, *_LIVE_LAT)
+        lon = _dig_paths(it, *_LIVE_LON)
+        alt = _dig_paths(it, *_LIVE_ALT)
+        spd = _dig_paths(it, *_LIVE_SPD)
+        track = _dig_paths(it, *_LIVE_TRACK)
+        squawk = _dig_paths(it, *_LIVE_SQUAWK)
+        ts = _dig_paths(it, *_LIVE_TS)
+        eta = _dig_paths(it, *_LIVE_ETA)
+        orig = _dig_paths(it, *_LIVE_ORIG)
+        dest = _dig_paths(it, *_LIVE_DEST)
+        frid = _dig_paths(it, *_LIVE_ID)
+        painted = _dig_paths(it, *_LIVE_PAINTED)
+        oper = _dig_paths(it, *_LIVE_OPER)
 
         out.append({
             "fr24_id": frid,
@@ -270,7 +462,7 @@ def _split_iata_num(query: str) -> Tuple[Optional[str], Optional[str]]:
     Returnerer (None, None) hvis ikke IATA2 + digits(+optional letter).
     """
     q = _norm(query)
-    m = re.match(r"^([A-Z]{2})([0-9]{1,4}[A-Z]?)$", q)
+    m = _IATA_NUM_RE.match(q)
     if not m:
         return None, None
     iata = m.group(1)
@@ -278,29 +470,31 @@ def _split_iata_num(query: str) -> Tuple[Optional[str], Optional[str]]:
     return iata, num
 
 
-def _match_flight_field(field: str, allowed_airline_codes: List[str],
+def _match_flight_field(field: str, allowed_airline_codes: frozenset,
                         num: str) -> bool:
     """
     Sjekk item.flight (IATA) – typisk 'DY540' / 'DY 540' / 'dy540a'.
+    Forventer allerede normalisert input (se filter_by_flight_number).
     """
-    f = _norm(field)
+    f = field
     if not f:
         return False
     fnum = _digits(f)
     if not fnum or fnum != num:
         return False
-    m = re.match(r"^([A-Z]+)", f)
+    m = _AIRLINE_PREFIX_RE.match(f)
     airline = m.group(1) if m else ""
     return airline in allowed_airline_codes
 
 
-def _match_callsign_field(field: str, allowed_icao_codes: List[str],
+def _match_callsign_field(field: str, allowed_icao_codes: frozenset,
                           num: str) -> bool:
     """
     Sjekk item.callsign (ICAO) – typisk 'NOZ540', 'NSZ540A', 'DLH5UJ'.
     Vi krever at tall-delen == num eller starter med num (tåler suffiks).
+    Forventer allerede normalisert input (se filter_by_flight_number).
     """
-    cs = _norm(field)
+    cs = field
     if not cs or len(cs) < 3:
         return False
     icao = cs[:3]
@@ -323,35 +517,31 @@ def filter_by_flight_number(items: List[Dict[str, Any]],
     """
     q = _norm(query)
 
+    # Normaliser én gang per item — alle fallback-nivåene under leser fra de
+    # samme ferdignormaliserte strengene i stedet for å re-normalisere per pass.
+    normed = []
+    for it in items:
+        f = _norm(it.get("flight"))
+        cs = _norm(it.get("callsign"))
+        normed.append((it, f, cs, _digits(f), _digits(cs)))
+
     # 1) Eksakt callsign, hvis det ser slik ut
-    if looks_like_callsign(q):
-        out = []
-        for it in items:
-            if _norm(it.get("callsign")) == q:
-                out.append(it)
-        return out
+    if _looks_like_callsign_normed(q):
+        return [it for it, _f, cs, _fd, _csd in normed if cs == q]
 
     # 2) IATA flight?
     iata, num = _split_iata_num(q)
     if not iata or not num:
         # fallback: ren strengsammenlikning på item.flight
-        out = []
-        for it in items:
-            if _norm(it.get("flight")) == q:
-                out.append(it)
-        return out
+        return [it for it, f, _cs, _fd, _csd in normed if f == q]
 
-    allowed_iata = [iata]
-    allowed_icao = AIRLINE_ALIASES.get(iata, []).copy()
+    # frozensets: O(1) medlemskapstest i per-item-løkka under
+    allowed_iata = frozenset((iata, ))
     # noen feeder bruker IATA i callsign-feltet – legg til som fallback
-    if iata not in allowed_icao:
-        allowed_icao.append(iata)
+    allowed_icao = frozenset(AIRLINE_ALIASES.get(iata, ())) | {iata}
 
     out: List[Dict[str, Any]] = []
-    for it in items:
-        f = it.get("flight")
-        cs = it.get("callsign")
-
+    for it, f, cs, _fd, _csd in normed:
         ok = False
         if f and _match_flight_field(f, allowed_iata, num):
             ok = True
@@ -367,23 +557,19 @@ def filter_by_flight_number(items: List[Dict[str, Any]],
     # 3) Som siste utvei – tall-likhet
     ndigs = _digits(q)
     num_match = [
-        it for it in items if _digits(it.get("flight")) == ndigs
-        or _digits(it.get("callsign")) == ndigs
+        it for it, _f, _cs, fd, csd in normed if fd == ndigs or csd == ndigs
     ]
     if num_match:
         return num_match
 
     # 4) Svak fallback: startswith / substring
     starts = [
-        it for it in items if _norm(it.get("flight")).startswith(q)
-        or _norm(it.get("callsign")).startswith(q)
+        it for it, f, cs, _fd, _csd in normed
+        if f.startswith(q) or cs.startswith(q)
     ]
     if starts:
         return starts
-    subs = [
-        it for it in items
-        if q in _norm(it.get("flight")) or q in _norm(it.get("callsign"))
-    ]
+    subs = [it for it, f, cs, _fd, _csd in normed if q in f or q in cs]
     return subs
 
 
@@ -398,6 +584,14 @@ def search_flights_by_number(
     Bruk hvis din plan støtter "flight summary".
     NB: Mange kontoer har ikke dette – gir 404. I så fall bruk live_positions().
     """
+    # rå-svar caches ikke (debug-modus)
+    cache_key = (None if return_raw else
+                 f"fr24:summary:{_norm(number)}:{day.isoformat()}:{limit}")
+    if cache_key:
+        hit = cache.get(cache_key)
+        if hit is not None:
+            return hit
+
     start, end = _iso_utc_day_range(day)
 
     path = FR24_FLIGHT_SUMMARY_PATH  # f.eks. "/flight-summary" eller "/flight-summary/full"
@@ -412,27 +606,18 @@ def search_flights_by_number(
     if "full" not in path and "light" not in path and FR24_FLIGHT_SUMMARY_VARIANT:
         params["variant"] = FR24_FLIGHT_SUMMARY_VARIANT
 
-    r = requests.get(FR24_API_BASE + path,
+    r = _SESSION.get(FR24_API_BASE + path,
                      headers=_headers(),
                      params=params,
                      timeout=15)
     r.raise_for_status()
-    j = r.json()
+    j = _loads_response(r)
 
     if return_raw:
         return j  # type: ignore[return-value]
 
     # Finn listefeltet uansett nøkkelnavn
-    items: List[Dict[str, Any]] = []
-    if isinstance(j, list):
-        items = j
-    elif isinstance(j, dict):
-        for key in ("data", "result", "results", "flights", "items", "records",
-                    "rows"):
-            v = j.get(key)
-            if isinstance(v, list):
-                items = v  # type: ignore[assignment]
-                break
+    items = _find_items_list(j)
 
     out: List[Dict[str, Any]] = []
     for it in items:
@@ -459,10 +644,20 @@ def search_flights_by_number(
             _dig(it, "datetime_landed", "scheduled_arrival",
                  "arrival.scheduled", "arrival.time"),
         })
+    if cache_key:
+        cache.set(cache_key, out, SUMMARY_CACHE_TTL)
     return out
 
 
 # === AIRPORT ARRIVALS (board) – avhenger av plan/endepunkt) ===
+# På en gitt plan er det bare én av kandidat-pathene som svarer 200 — de
+# andre gir pålitelig 404. Husk hvilken som virket, så steady-state blir
+# ett kall i stedet for opptil tre (faller tilbake til full løkke ved
+# plan-endring).
+_AIRPORT_BOARD_WORKING_PATH: Optional[int] = None
+
+
+
 def airport_arrivals(
     airport_code: str,  # "SVG" eller "ENZV"
     hours_from: int = 0,
@@ -495,6 +690,14 @@ def airport_arrivals(
         # brukeren gav kanskje "SVG", det er OK; men hvis helt off – kast klar feil
         raise ValueError("airport_code må være IATA (3) eller ICAO (4).")
 
+    # rå-svar caches ikke (debug-modus)
+    cache_key = (None if return_raw else
+                 f"fr24:arrivals:{code}:{hours_from}:{hours_to}:{limit}")
+    if cache_key:
+        hit = cache.get(cache_key)
+        if hit is not None:
+            return hit
+
     # Kandidat-paths (rekkefølge viktig). Param-funksjonen lager params for hver kandidat.
     def p1() -> Tuple[str, Dict[str, str]]:
         # Variant 1: /airports/board?code=ENZV&type=arrivals
@@ -535,22 +738,25 @@ def airport_arrivals(
 
     candidates: List[Tuple[str, Dict[str, str]]] = [p1(), p2(), p3()]
 
+    # Prøv sist fungerende path først
+    global _AIRPORT_BOARD_WORKING_PATH
+    order = list(range(len(candidates)))
+    if _AIRPORT_BOARD_WORKING_PATH is not None:
+        order.remove(_AIRPORT_BOARD_WORKING_PATH)
+        order.insert(0, _AIRPORT_BOARD_WORKING_PATH)
+
     last_exc: Optional[Exception] = None
-    for path, params in candidates:
+    for idx in order:
+        path, params = candidates[idx]
         try:
-            r = requests.get(
-                FR24_API_BASE + path,
-                headers=_headers(),
-                params=params,
-                timeout=15,
-            )
+            r, j = _conditional_get(path, params)
             # Noen planer gir 404/403 for ikke-støttede path
             if r.status_code >= 400:
                 last_exc = requests.HTTPError(f"{r.status_code} for {path}",
                                               response=r)
                 continue
 
-            j = r.json()
+            _AIRPORT_BOARD_WORKING_PATH = idx
             if return_raw:
                 # Gi rådata + litt meta i en liste (enhetlig returtype)
                 return [{
@@ -560,47 +766,22 @@ def airport_arrivals(
                     "_raw": j,
                 }]
 
-            # Normaliser: finn en liste i j
-            payload = None
-            if isinstance(j, list):
-                payload = j
-            elif isinstance(j, dict):
-                for key in ("arrivals", "data", "result", "results", "flights",
-                            "items", "records", "rows"):
-                    v = j.get(key)
-                    if isinstance(v, list):
-                        payload = v
-                        break
-                if payload is None and isinstance(j.get("aircraft"), list):
-                    payload = j["aircraft"]
-
-            if not isinstance(payload, list):
-                # vi fikk 200, men ukjent struktur – returner tom liste
-                return []
+            # Normaliser: finn en liste i j (200 med ukjent struktur → tom liste)
+            payload = _find_items_list(j)
 
             out: List[Dict[str, Any]] = []
             for it in payload:
                 out.append({
-                    "flight":
-                    _dig(it, "flight", "flight_iata", "callsign", "ident",
-                         "label"),
-                    "callsign":
-                    _dig(it, "callsign", "ident", "label"),
-                    "orig_iata":
-                    _dig(it, "origin.iata", "orig_iata",
-                         "airport.origin.code.iata", "origin.code"),
-                    "dest_iata":
-                    _dig(it, "destination.iata", "dest_iata",
-                         "airport.destination.code.iata", "destination.code"),
-                    "eta":
-                    _dig(it, "arrival.estimated", "times.estimated.arrival",
-                         "eta", "est_arrival_time"),
-                    "schedule":
-                    _dig(it, "arrival.scheduled", "times.scheduled.arrival",
-                         "schedule_time"),
-                    "status":
-                    _dig(it, "status", "operation.status", "status.code"),
+                    "flight": _dig_paths(it, *_ARR_FLIGHT),
+                    "callsign": _dig_paths(it, *_ARR_CALLSIGN),
+                    "orig_iata": _dig_paths(it, *_ARR_ORIG),
+                    "dest_iata": _dig_paths(it, *_ARR_DEST),
+                    "eta": _dig_paths(it, *_ARR_ETA),
+                    "schedule": _dig_paths(it, *_ARR_SCHED),
+                    "status": _dig_paths(it, *_ARR_STATUS),
                 })
+            if cache_key:
+                cache.set(cache_key, out, ARRIVALS_CACHE_TTL)
             return out
 
         except Exception as e:
@@ -3,25 +3,24 @@ import sys
 import json
 import calendar
 import datetime as dt
-from typing import Iterable
+from typing import List
 
 from django.core.management.base import BaseCommand, CommandError
-from django.db import transaction, IntegrityError
+from django.db import transaction
 
 import requests  # pip install requests om du ikke har det
 
 from api.models import Holiday
 
 
-def iter_sundays(year: int) -> Iterable[dt.date]:
-    """Yield alle søndager i gitt år."""
-    d = dt.date(year, 1, 1)
-    # finn første søndag
-    days_until_sunday = (6 - d.weekday()) % 7  # Monday=0 ... Sunday=6
-    d = d + dt.timedelta(days=days_until_sunday)
-    while d.year == year:
-        yield d
-        d = d + dt.timedelta(days=7)
+def iter_sundays(year: int) -> List[dt.date]:
+    """Alle søndager i gitt år, som flat liste (klar for bulk-insert)."""
+    first = dt.date(year, 1, 1)
+    # finn første søndag (Monday=0 ... Sunday=6)
+    first = first + dt.timedelta(days=(6 - first.weekday()) % 7)
+    # antallet er kjent på forhånd — generer direkte i stedet for while-løkke
+    n = ((dt.date(year, 12, 31) - first).days // 7) + 1
+    return [first + dt.timedelta(days=7 * i) for i in range(n)]
 
 
 class Command(BaseCommand):
@@ -73,50 +72,58 @@ class Command(BaseCommand):
                     ))
                 holidays_from_api = []
 
-        # 2) Lagre/oppdater røde dager fra API
+        # 2) Samle alt og skriv i bulk — ett SELECT på eksisterende datoer og
+        #    én INSERT per gruppe i stedet for en rundtur per dag.
+        api_rows = {}
+        for h in holidays_from_api:
+            try:
+                date_str = h.get("date")  # 'YYYY-MM-DD'
+                name = h.get("localName") or h.get("name") or "Helligdag"
+                d = dt.date.fromisoformat(date_str)
+            except Exception:
+                continue
+            api_rows[d] = name
+
+        sundays = iter_sundays(year) if include_sundays else []
+
+        all_dates = set(api_rows) | set(sundays)
+        existing = set(
+            Holiday.objects.filter(date__in=all_dates).values_list(
+                "date", flat=True)) if all_dates else set()
+
         with transaction.atomic():
-            for h in holidays_from_api:
-                try:
-                    date_str = h.get("date")  # 'YYYY-MM-DD'
-                    name = h.get("localName") or h.get("name") or "Helligdag"
-                    d = dt.date.fromisoformat(date_str)
-                except Exception:
-                    continue
-
-                # Merk: Hvis din Holiday-modell har unique=True på date,
-                # så er det én oppføring per dato (uansett land)
-                obj, was_created = Holiday.objects.update_or_create(
-                    date=d,
-                    defaults={
-                        "name": name,
-                        "country_code": country,
-                    },
+            # Røde dager fra API: INSERT ... ON CONFLICT DO UPDATE.
+            # Merk: Holiday har unique=True på date, så det er én oppføring
+            # per dato (uansett land).
+            if api_rows:
+                Holiday.objects.bulk_create(
+                    [
+                        Holiday(date=d, name=n, country_code=country)
+                        for d, n in api_rows.items()
+                    ],
+                    update_conflicts=True,
+                    unique_fields=["date"],
+                    update_fields=["name", "country_code"],
+                )
+                created += len(set(api_rows) - existing)
+                updated += len(set(api_rows) & existing)
+
+            # 3) Marker alle søndager som røde dager. Kun INSERT for datoer
+            # som ikke finnes fra før — en eksisterende oppføring (f.eks.
+            # helligdag på søndag) beholder navnet sitt.
+            new_sundays = [
+                d for d in sundays if d not in existing and d not in api_rows
+            ]
+            if new_sundays:
+                Holiday.objects.bulk_create(
+                    [
+                        Holiday(date=d, name="Søndag", country_code=country)
+                        for d in new_sundays
+                    ],
+                    ignore_conflicts=True,
                 )
-                if was_created:
-                    created += 1
-                else:
-                    updated += 1
-
-        # 3) Marker alle søndager som røde dager
-        if include_sundays:
-            with transaction.atomic():
-                for d in iter_sundays(year):
-                    try:
-                        obj, was_created = Holiday.objects.get_or_create(
-                            date=d,
-                            defaults={
-                                "name": "Søndag",
-                                "country_code": country,
-                            },
-                        )
-                        if was_created:
-                            created += 1
-                        else:
-                            # Hvis den finnes fra før (f.eks. allerede en helligdag på søndag),
-                            # lar vi den stå (ikke overskriv navnet).
-                            skipped += 1
-                    except IntegrityError:
-                        skipped += 1
+            created += len(new_sundays)
+            skipped += len(sundays) - len(new_sundays)
 
         self.stdout.write(
             self.style.SUCCESS(
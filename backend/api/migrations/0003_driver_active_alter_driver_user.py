@@ -6,11 +6,10 @@ import django.db.models.deletion
 
 def map_status_to_active(apps, schema_editor):
     Driver = apps.get_model('api', 'Driver')
-    for d in Driver.objects.all():
-        # status kan være None; vi tolker alt annet enn 'active' som False
-        status = (d.status or '').lower()
-        d.active = (status == 'active')
-        d.save(update_fields=['active'])
+    # status kan være None; vi tolker alt annet enn 'active' som False.
+    # To bulk-UPDATEs i stedet for én save() per rad.
+    Driver.objects.filter(status__iexact='active').update(active=True)
+    Driver.objects.exclude(status__iexact='active').update(active=False)
 
 
 class Migration(migrations.Migration):
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.6 on 2026-08-31 14:44
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_trip_flight_number_trip_po_number'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='trip',
+            name='flight_number',
+            field=models.CharField(blank=True, db_index=True, max_length=16, null=True),
+        ),
+        migrations.AlterField(
+            model_name='trip',
+            name='po_number',
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(django.db.models.functions.text.Upper('name'), name='cust_name_upper_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.0.6 on 2026-08-31 14:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_alter_trip_flight_number_alter_trip_po_number_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='trip',
+            name='status',
+            field=models.CharField(choices=[('unassigned', 'unassigned'), ('assigned', 'assigned'), ('exception', 'exception')], db_index=True, default='unassigned', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['driver', 'assigned_at'], name='api_assignm_driver__775ccd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['date', 'status'], name='api_trip_date_bb3345_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['customer', 'date'], name='api_trip_custome_14f589_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['vehicle', 'date'], name='api_trip_vehicle_9a9051_idx'),
+        ),
+    ]
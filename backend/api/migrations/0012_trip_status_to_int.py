@@ -0,0 +1,51 @@
+# Trip.status: CharField -> PositiveSmallIntegerField (se Trip.STATUS_*)
+from django.db import migrations, models
+
+STATUS_MAP = {"unassigned": 0, "assigned": 1, "exception": 2}
+
+
+def strings_to_ints(apps, schema_editor):
+    Trip = apps.get_model("api", "Trip")
+    # Én UPDATE per status-verdi i stedet for save() per rad.
+    for name, value in STATUS_MAP.items():
+        Trip.objects.filter(status=name).update(status_int=value)
+
+
+def ints_to_strings(apps, schema_editor):
+    Trip = apps.get_model("api", "Trip")
+    for name, value in STATUS_MAP.items():
+        Trip.objects.filter(status_int=value).update(status=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0011_alter_trip_status_and_more"),
+    ]
+
+    operations = [
+        # (date, status)-indeksen avhenger av kolonnen som byttes ut
+        migrations.RemoveIndex(
+            model_name="trip",
+            name="api_trip_date_bb3345_idx",
+        ),
+        migrations.AddField(
+            model_name="trip",
+            name="status_int",
+            field=models.PositiveSmallIntegerField(
+                choices=[(0, "unassigned"), (1, "assigned"), (2, "exception")],
+                default=0,
+                db_index=True,
+            ),
+        ),
+        migrations.RunPython(strings_to_ints, ints_to_strings),
+        migrations.RemoveField(model_name="trip", name="status"),
+        migrations.RenameField(model_name="trip",
+                               old_name="status_int",
+                               new_name="status"),
+        migrations.AddIndex(
+            model_name="trip",
+            index=models.Index(fields=["date", "status"],
+                               name="api_trip_date_bb3345_idx"),
+        ),
+    ]
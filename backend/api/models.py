@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Upper
 from django.contrib.auth import get_user_model
 from django.conf import settings
 
@@ -10,6 +11,12 @@ class Customer(models.Model):
     orgnr = models.CharField(max_length=50, blank=True, null=True)
     invoice_email = models.EmailField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            # admin-søk på customer__name er case-insensitivt
+            models.Index(Upper("name"), name="cust_name_upper_idx"),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -110,13 +117,25 @@ class Shift(models.Model):
 
 
 class Trip(models.Model):
+    # Heltall i stedet for 20-tegns strenger: mindre rader, mindre/raskere
+    # indeks på status-filtre. API-et eksponerer fortsatt navnene.
+    STATUS_UNASSIGNED = 0
+    STATUS_ASSIGNED = 1
+    STATUS_EXCEPTION = 2
     STATUS_CHOICES = [
-        ("unassigned", "unassigned"),
-        ("assigned", "assigned"),
-        ("exception", "exception"),
+        (STATUS_UNASSIGNED, "unassigned"),
+        (STATUS_ASSIGNED, "assigned"),
+        (STATUS_EXCEPTION, "exception"),
     ]
-    flight_number = models.CharField(max_length=16, blank=True, null=True)
-    po_number = models.CharField(max_length=64, blank=True, null=True)
+    STATUS_BY_NAME = {name: value for value, name in STATUS_CHOICES}
+    flight_number = models.CharField(max_length=16,
+                                     blank=True,
+                                     null=True,
+                                     db_index=True)
+    po_number = models.CharField(max_length=64,
+                                 blank=True,
+                                 null=True,
+                                 db_index=True)
     date = models.DateField()
     start_time = models.TimeField()
     duration_min = models.IntegerField(default=30)
@@ -147,9 +166,9 @@ class Trip(models.Model):
                                  related_name="trips")
     pax = models.IntegerField()
     price = models.IntegerField(null=True, blank=True)
-    status = models.CharField(max_length=20,
-                              choices=STATUS_CHOICES,
-                              default="unassigned")
+    status = models.PositiveSmallIntegerField(choices=STATUS_CHOICES,
+                                              default=STATUS_UNASSIGNED,
+                                              db_index=True)
     comment = models.TextField(blank=True, null=True)
     exception_note = models.TextField(blank=True, null=True)
 
@@ -169,6 +188,14 @@ class Trip(models.Model):
         related_name="invoiced_trips",
     )
 
+    class Meta:
+        indexes = [
+            # Dekker de vanligste list-filtrene (dato/status/kunde/bil)
+            models.Index(fields=["date", "status"]),
+            models.Index(fields=["customer", "date"]),
+            models.Index(fields=["vehicle", "date"]),
+        ]
+
     def __str__(self):
         return f"{self.date} {self.start_time} {self.origin_location}→{self.destination_location}"
 
@@ -187,5 +214,11 @@ class Assignment(models.Model):
                                     related_name='made_assignments')
     assigned_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # "turene til sjåfør X, nyeste først"
+            models.Index(fields=["driver", "assigned_at"]),
+        ]
+
     def __str__(self):
         return f"{self.trip} → {self.driver.name}"
@@ -1,3 +1,5 @@
+from copy import copy
+
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.db import transaction
@@ -5,56 +7,81 @@ from .models import Customer, PricePlan, CustomerPricePlan, Holiday, Location, V
 from .services import pricing_for_trip
 
 
-class UserSerializer(serializers.ModelSerializer):
+class CachedFieldsSerializerMixin:
+    """
+    DRF deepcopy-er alle felt-deklarasjoner for hver serializer-instans —
+    på list-endepunkter med mange rader dominerer det CPU-bruken. Cache
+    det ferdigbygde feltsettet per klasse og gi hver instans grunne
+    kopier i stedet (ubundne felt er tilstandsløse utover bind()).
+    """
+    _fields_cache = {}
+
+    def get_fields(self):
+        cls = self.__class__
+        fields = CachedFieldsSerializerMixin._fields_cache.get(cls)
+        if fields is None:
+            fields = super().get_fields()
+            CachedFieldsSerializerMixin._fields_cache[cls] = fields
+        return {name: copy(field) for name, field in fields.items()}
+
+
+class UserSerializer(CachedFieldsSerializerMixin, serializers.ModelSerializer):
 
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'first_name', 'last_name']
 
 
-class CustomerSerializer(serializers.ModelSerializer):
+class CustomerSerializer(CachedFieldsSerializerMixin,
+                         serializers.ModelSerializer):
 
     class Meta:
         model = Customer
         fields = '__all__'
 
 
-class PricePlanSerializer(serializers.ModelSerializer):
+class PricePlanSerializer(CachedFieldsSerializerMixin,
+                          serializers.ModelSerializer):
 
     class Meta:
         model = PricePlan
         fields = '__all__'
 
 
-class CustomerPricePlanSerializer(serializers.ModelSerializer):
+class CustomerPricePlanSerializer(CachedFieldsSerializerMixin,
+                                  serializers.ModelSerializer):
 
     class Meta:
         model = CustomerPricePlan
         fields = '__all__'
 
 
-class HolidaySerializer(serializers.ModelSerializer):
+class HolidaySerializer(CachedFieldsSerializerMixin,
+                        serializers.ModelSerializer):
 
     class Meta:
         model = Holiday
         fields = '__all__'
 
 
-class LocationSerializer(serializers.ModelSerializer):
+class LocationSerializer(CachedFieldsSerializerMixin,
+                         serializers.ModelSerializer):
 
     class Meta:
         model = Location
         fields = '__all__'
 
 
-class VehicleSerializer(serializers.ModelSerializer):
+class VehicleSerializer(CachedFieldsSerializerMixin,
+                        serializers.ModelSerializer):
 
     class Meta:
         model = Vehicle
         fields = ["id", "name", "vehicle_type", "reg_no", "seats", "active"]
 
 
-class DriverSerializer(serializers.ModelSerializer):
+class DriverSerializer(CachedFieldsSerializerMixin,
+                       serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     user_id = serializers.PrimaryKeyRelatedField(source="user",
                                                  queryset=User.objects.all(),
@@ -67,14 +94,16 @@ class DriverSerializer(serializers.ModelSerializer):
         fields = ["id", "name", "phone", "active", "user", "user_id"]
 
 
-class ShiftSerializer(serializers.ModelSerializer):
+class ShiftSerializer(CachedFieldsSerializerMixin,
+                      serializers.ModelSerializer):
 
     class Meta:
         model = Shift
         fields = '__all__'
 
 
-class TripSerializer(serializers.ModelSerializer):
+class TripSerializer(CachedFieldsSerializerMixin,
+                     serializers.ModelSerializer):
     # Write-only felter for "smarte lokasjoner"
     origin_name = serializers.CharField(write_only=True, required=False)
     destination_name = serializers.CharField(write_only=True, required=False)
@@ -89,6 +118,8 @@ class TripSerializer(serializers.ModelSerializer):
     # Lesbare felter
     current_driver = serializers.SerializerMethodField(read_only=True)
     price = serializers.IntegerField(required=False, allow_null=True)
+    # status lagres som tall (Trip.STATUS_*) — API-et viser navnet som før
+    status = serializers.CharField(source="get_status_display", read_only=True)
 
     # Faktura (read-only ut)
     invoiced = serializers.BooleanField(read_only=True)
@@ -102,7 +133,14 @@ class TripSerializer(serializers.ModelSerializer):
         return {"id": u.id, "username": getattr(u, "username", None)}
 
     def get_current_driver(self, obj):
-        a = getattr(obj, "assignment", None)
+        # Forventer select_related("assignment__driver__user") på queryset-et
+        # (se TripViewSet) — da ligger relasjonen i felt-cachen og kan leses
+        # direkte, uten DoesNotExist-heising per rad uten assignment.
+        fields_cache = obj._state.fields_cache
+        if "assignment" in fields_cache:
+            a = fields_cache["assignment"]
+        else:
+            a = getattr(obj, "assignment", None)
         if not a:
             return None
         d = a.driver
@@ -145,7 +183,6 @@ class TripSerializer(serializers.ModelSerializer):
             "po_number",
         ]
         read_only_fields = [
-            "status",
             "created_at",
             "current_driver",
             "invoiced",
@@ -168,8 +205,19 @@ class TripSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 {"price": "Price is required when no customer is selected."})
 
-        has_plan = CustomerPricePlan.objects.filter(customer=customer).exists()
-        if not has_plan and price in (None, ""):
+        # Hent koblingen med plan i samme slengen — create() gjenbruker den
+        # i pricing_for_trip, så vi slipper én SELECT per skriv. Cachen på
+        # self gjør at bulk-POST (many=True) bare spør én gang per kunde.
+        cache = getattr(self, "_plan_cache", None)
+        if cache is None:
+            cache = self._plan_cache = {}
+        if customer.pk in cache:
+            link = cache[customer.pk]
+        else:
+            link = cache[customer.pk] = CustomerPricePlan.objects.filter(
+                customer=customer).select_related("price_plan").first()
+        attrs["_plan_link"] = link
+        if link is None and price in (None, ""):
             raise serializers.ValidationError({
                 "price":
                 "Price is required because this customer has no price plan."
@@ -177,35 +225,50 @@ class TripSerializer(serializers.ModelSerializer):
 
         return attrs
 
-    def _ensure_location(self, name: str):
-        loc, _ = Location.objects.get_or_create(name=name.strip())
-        return loc
+    def _pop_location_names(self, validated):
+        return {
+            "origin": validated.pop("origin_name", None),
+            "destination": validated.pop("destination_name", None),
+            "stop1": validated.pop("stop1_name", None),
+            "stop2": validated.pop("stop2_name", None),
+        }
+
+    def _ensure_locations(self, names):
+        """Slå opp/opprett alle navngitte lokasjoner i 1-2 spørringer,
+        i stedet for get_or_create per felt (opptil 4 rundturer)."""
+        wanted = {k: n.strip() for k, n in names.items() if n and n.strip()}
+        if not wanted:
+            return {}
+        unique = set(wanted.values())
+        found = {l.name: l for l in Location.objects.filter(name__in=unique)}
+        missing = unique - set(found)
+        if missing:
+            Location.objects.bulk_create(
+                [Location(name=n) for n in missing], ignore_conflicts=True)
+            found.update(
+                {l.name: l
+                 for l in Location.objects.filter(name__in=missing)})
+        return {k: found[n] for k, n in wanted.items()}
 
     @transaction.atomic
     def create(self, validated):
+        plan_link = validated.pop("_plan_link", None)
         # Navn → FK
-        origin_name = validated.pop("origin_name", None)
-        destination_name = validated.pop("destination_name", None)
-        stop1_name = validated.pop("stop1_name", None)
-        stop2_name = validated.pop("stop2_name", None)
-        if origin_name and not validated.get("origin_location"):
-            validated["origin_location"] = self._ensure_location(origin_name)
-        if destination_name and not validated.get("destination_location"):
-            validated["destination_location"] = self._ensure_location(
-                destination_name)
-        if stop1_name and not validated.get("stop1_location"):
-            validated["stop1_location"] = self._ensure_location(stop1_name)
-        if stop2_name and not validated.get("stop2_location"):
-            validated["stop2_location"] = self._ensure_location(stop2_name)
+        locs = self._ensure_locations(self._pop_location_names(validated))
+        for key, loc in locs.items():
+            if not validated.get(f"{key}_location"):
+                validated[f"{key}_location"] = loc
 
         # Pris hvis utelatt men prisplan finnes
         if ("price" not in validated) or (validated.get("price")
                                           in (None, "")):
-            validated["price"] = pricing_for_trip(validated)
+            validated["price"] = pricing_for_trip(validated,
+                                                  plan_link=plan_link)
 
         # Status ut fra tildeling
         driver_id = validated.pop("driver_id", None)
-        validated["status"] = "assigned" if driver_id else "unassigned"
+        validated["status"] = (Trip.STATUS_ASSIGNED
+                               if driver_id else Trip.STATUS_UNASSIGNED)
 
         trip = super().create(validated)
 
@@ -216,38 +279,40 @@ class TripSerializer(serializers.ModelSerializer):
             except Driver.DoesNotExist:
                 raise serializers.ValidationError(
                     {"driver_id": "Driver not found or inactive"})
-            Assignment.objects.update_or_create(trip=trip,
-                                                defaults={"driver": driver})
+            # INSERT ... ON CONFLICT DO UPDATE: én spørring i stedet for
+            # SELECT + UPDATE/INSERT
+            Assignment.objects.bulk_create(
+                [Assignment(trip=trip, driver=driver)],
+                update_conflicts=True,
+                unique_fields=["trip"],
+                update_fields=["driver"],
+            )
         return trip
 
     @transaction.atomic
     def update(self, instance, validated):
+        validated.pop("_plan_link", None)
         # Navn → FK ved oppdatering
-        origin_name = validated.pop("origin_name", None)
-        destination_name = validated.pop("destination_name", None)
-        stop1_name = validated.pop("stop1_name", None)
-        stop2_name = validated.pop("stop2_name", None)
-        if origin_name:
-            validated["origin_location"] = self._ensure_location(origin_name)
-        if destination_name:
-            validated["destination_location"] = self._ensure_location(
-                destination_name)
-        if stop1_name:
-            validated["stop1_location"] = self._ensure_location(stop1_name)
-        if stop2_name:
-            validated["stop2_location"] = self._ensure_location(stop2_name)
+        locs = self._ensure_locations(self._pop_location_names(validated))
+        for key, loc in locs.items():
+            validated[f"{key}_location"] = loc
 
         driver_id = validated.pop("driver_id", None)
 
-        trip = super().update(instance, validated)
+        # Ren sjåfør-endring (PATCH med bare driver_id): ikke utsted en
+        # full-rad UPDATE for felter som ikke er endret.
+        if validated:
+            trip = super().update(instance, validated)
+        else:
+            trip = instance
 
         # Endre tildeling om driver_id ble sendt
         if driver_id is not None:
             if driver_id in ("", None):
                 # fjern tildeling
                 Assignment.objects.filter(trip=trip).delete()
-                if trip.status != "unassigned":
-                    trip.status = "unassigned"
+                if trip.status != Trip.STATUS_UNASSIGNED:
+                    trip.status = Trip.STATUS_UNASSIGNED
                     trip.save(update_fields=["status"])
             else:
                 try:
@@ -255,15 +320,24 @@ class TripSerializer(serializers.ModelSerializer):
                 except Driver.DoesNotExist:
                     raise serializers.ValidationError(
                         {"driver_id": "Driver not found or inactive"})
-                Assignment.objects.update_or_create(
-                    trip=trip, defaults={"driver": driver})
-                if trip.status == "unassigned":
-                    trip.status = "assigned"
+                Assignment.objects.bulk_create(
+                    [Assignment(trip=trip, driver=driver)],
+                    update_conflicts=True,
+                    unique_fields=["trip"],
+                    update_fields=["driver"],
+                )
+                if trip.status == Trip.STATUS_UNASSIGNED:
+                    trip.status = Trip.STATUS_ASSIGNED
                     trip.save(update_fields=["status"])
+                # upserten utløser ikke Assignment-signalet — invalider
+                # listecachen eksplisitt (lazy import: views importerer oss)
+                from .views import _bump_trip_list_version
+                _bump_trip_list_version()
         return trip
 
 
-class AssignmentSerializer(serializers.ModelSerializer):
+class AssignmentSerializer(CachedFieldsSerializerMixin,
+                           serializers.ModelSerializer):
 
     class Meta:
         model = Assignment
@@ -0,0 +1,48 @@
+# backend/api/tasks.py
+"""
+Bakgrunnsjobber.
+
+Prosjektet har ingen Celery/worker-stack, så jobbene kjøres i en liten
+daemon-trådpool i samme prosess. Poenget er at trege eksterne kall
+(Avinor/FR24) ikke skal blokkere request-tråden — resultatet lander i
+cachen som integrasjonene uansett leser fra.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from .integrations.avinor import find_eta_svg_by_flight
+
+_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="api-tasks")
+
+
+def refresh_avinor_feed(params: dict, headers: dict):
+    """
+    Frisk opp XML-feed-cachen for gitt (airport, timeFrom, timeTo) utenfor
+    request-tråden — viewet serverer den stale kopien i mellomtiden
+    (stale-while-revalidate). Best effort: feil svelges.
+    """
+
+    def _run():
+        try:
+            # lazy import: views importerer tasks ved oppstart
+            from .views import _fetch_avinor_xml
+            _fetch_avinor_xml(params, headers)
+        except Exception:
+            pass
+
+    return _EXECUTOR.submit(_run)
+
+
+def refresh_trip_eta(flight_number: str, date_str=None):
+    """
+    Varm opp Avinor-cachen for (flightnr, dato) utenfor request-tråden,
+    slik at neste ETA-oppslag treffer cache i stedet for å vente på HTTP.
+    Best effort: feil svelges — et synkront kall henter uansett selv.
+    """
+
+    def _run():
+        try:
+            find_eta_svg_by_flight(flight_number, date_str)
+        except Exception:
+            pass
+
+    return _EXECUTOR.submit(_run)
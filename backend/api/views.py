@@ -1,12 +1,21 @@
 from rest_framework import viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from urllib.parse import urlencode
+
+from django.core.cache import cache
 from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.db.models.signals import post_delete, post_save
 from django.utils import timezone
+from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
+from django.db.models import Count, Exists, OuterRef, Q
 from .models import (Customer, PricePlan, CustomerPricePlan, Holiday, Location,
                      Vehicle, Driver, Shift, Trip, Assignment)
+from .fast_serializers import TRIP_LIST_COLUMNS, trip_row_to_dict
+from .integrations.fr24 import airport_arrivals
+from .tasks import refresh_avinor_feed
 from .serializers import (CustomerSerializer, PricePlanSerializer,
                           CustomerPricePlanSerializer, HolidaySerializer,
                           LocationSerializer, VehicleSerializer,
@@ -18,24 +27,167 @@ from datetime import date as _date
 from django.utils import timezone
 from rest_framework import status as http_status
 import datetime as dt
+import hashlib
+from functools import lru_cache
+from io import BytesIO
 import requests
+import string
 import xml.etree.ElementTree as ET
 import re
+
+try:
+    # libxml2-basert parser med innebygd recovery — raskere enn expat på
+    # store feeder, og recover=True gjør dobbel-escape-fallbacken overflødig
+    from lxml import etree as lxml_etree
+except ImportError:  # pragma: no cover
+    lxml_etree = None
+
+if lxml_etree is not None:
+    # Prekompilerte XPath-objekter: findall/findtext kompilerer uttrykket
+    # på nytt per kall, XPath.__call__ gjenbruker det kompilerte
+    _XP_FLIGHTS = lxml_etree.XPath(".//flight")
+    _XP_FID = lxml_etree.XPath("string(flight_id)")
+    _XP_SCHED = lxml_etree.XPath("string(schedule_time)")
+    _XP_EST = lxml_etree.XPath("string(est_arrival_time)")
+    _XP_AIRLINE = lxml_etree.XPath("string(airline)")
+    _XP_ROUTE = lxml_etree.XPath("string(route)")
+    _XP_STATUS_TXT = lxml_etree.XPath("string(status)")
+    _XP_STATUS = lxml_etree.XPath("status")
 from django.utils.timezone import now as dj_now
 
 # ---------------- Avinor ETA ----------------
 AVINOR_XML = "https://asrv.avinor.no/XmlFeed/v1.0"
 SVG_IATA = "SVG"  # Stavanger
 
-_BAD_XML_CHARS = re.compile(r"[\x00-\x08\x0B\x0C\x0E-\x1F\uD800-\uDFFF]")
+# Pooled session for upstream-kall: gjenbruker keep-alive-forbindelsen og
+# slipper TCP+TLS-handshake per request. Faste headere settes én gang.
+_HTTP = requests.Session()
+_HTTP.headers.update({"User-Agent": "transport-backend/1.0"})
+_HTTP.mount(
+    "https://",
+    requests.adapters.HTTPAdapter(pool_connections=10,
+                                  pool_maxsize=20,
+                                  max_retries=requests.adapters.Retry(
+                                      total=2,
+                                      backoff_factor=0.2,
+                                      status_forcelist=(502, 503, 504))))
+
+# Feeden endrer seg bare med minutters mellomrom — husk ETag/Last-Modified
+# og send If-None-Match/If-Modified-Since, så svarer Avinor 304 og vi
+# slipper både nedlasting og rensing av uendret XML.
+AVINOR_COND_TTL = 300  # sekunder
+
+# Cache-aside med stale-while-revalidate: innenfor ferskt vindu svarer
+# viewet uten HTTP i det hele tatt; i stale-vinduet serveres forrige
+# kopi umiddelbart mens en bakgrunnstråd frisker opp. Én treg Avinor
+# binder dermed ikke opp en request-tråd.
+AVINOR_FEED_TTL = 30  # sekunder ferskt
+AVINOR_FEED_STALE_TTL = 90  # sekunder servérbart mens refresh pågår
+
+
+def _avinor_cond_key(params) -> str:
+    return "avinor:xml:%s:%s:%s" % (params["airport"], params["timeFrom"],
+                                    params["timeTo"])
+
+
+def _avinor_feed_key(params) -> str:
+    return "avinor:feed:%s:%s:%s" % (params["airport"], params["timeFrom"],
+                                     params["timeTo"])
+
+
+def _fetch_avinor_xml(params: dict, headers: dict):
+    """Hent, rens og cache Avinor-feeden (synkront).
+
+    Returnerer (cleaned, err_payload, err_status); cleaned er None ved
+    feil. Brukes både fra request-tråden (cache-miss) og fra
+    bakgrunnsoppfriskingen i tasks.refresh_avinor_feed.
+    """
+    cond_key = _avinor_cond_key(params)
+    cond = cache.get(cond_key)
+    hdrs = dict(headers)
+    if cond:
+        if cond.get("etag"):
+            hdrs["If-None-Match"] = cond["etag"]
+        if cond.get("last_modified"):
+            hdrs["If-Modified-Since"] = cond["last_modified"]
+
+    cleaned = None
+    try:
+        r = _HTTP.get(
+            AVINOR_XML,
+            params=params,
+            headers=hdrs,
+            timeout=15,
+            allow_redirects=False,
+        )
+
+        if r.status_code == 304 and cond:
+            # Uendret feed — gjenbruk den rensede XML-en fra forrige svar
+            cleaned = cond["xml"]
+        elif 300 <= r.status_code < 400:
+            return None, {
+                "detail": "Avinor svarte med redirect (ikke XML).",
+                "status": r.status_code,
+                "location": r.headers.get("Location"),
+            }, 502
+
+        if cleaned is None:
+            r.raise_for_status()
+            text = r.text
+
+            ct = (r.headers.get("Content-Type") or "").lower()
+            if "xml" not in ct and not text.lstrip().startswith("<"):
+                return None, {
+                    "detail":
+                    "Avinor returnerte ikke XML (mulig HTML/cookie-side).",
+                    "content_type": ct,
+                    "snippet": text[:400],
+                }, 502
+    except requests.HTTPError as e:
+        return None, {"detail": f"Avinor HTTP: {e}"}, 502
+    except Exception as e:
+        return None, {"detail": str(e)}, 502
+
+    if cleaned is None:
+        cleaned = _clean_xml_text(text)
+        etag = r.headers.get("ETag")
+        last_modified = r.headers.get("Last-Modified")
+        if etag or last_modified:
+            cache.set(cond_key, {
+                "etag": etag,
+                "last_modified": last_modified,
+                "xml": cleaned,
+            }, AVINOR_COND_TTL)
+
+    feed_key = _avinor_feed_key(params)
+    cache.set(feed_key, cleaned, AVINOR_FEED_TTL)
+    cache.set(feed_key + ":stale", cleaned, AVINOR_FEED_STALE_TTL)
+    return cleaned, None, None
+
+# Slettetabell for tegn XML 1.0 forbyr (kontrolltegn + surrogater) pluss
+# BOM — én C-løkke med translate i stedet for et regex-pass.
+_BAD_XML_TRANSLATE = {
+    c: None
+    for c in (list(range(0, 9)) + [11, 12] + list(range(14, 32)) +
+              list(range(0xD800, 0xE000)) + [0xFEFF])
+}
+# re.ASCII: byte-klassetabeller i stedet for Unicode-oppslag i motoren
 _UNESCAPED_AMP = re.compile(
-    r"&(?!(?:amp|lt|gt|quot|apos|#[0-9]+|#[xX][0-9a-fA-F]+);)")
+    r"&(?!(?:amp|lt|gt|quot|apos|#[0-9]+|#[xX][0-9a-fA-F]+);)", re.ASCII)
+
+
+# Slettetabell som beholder kun [A-Z0-9]: én C-løkke uten regex-dispatch
+# og uten mellomstreng per flight i matche-løkka.
+_FNO_KEEP = frozenset(string.ascii_uppercase + string.digits)
+_FNO_TRANS = {c: None for c in range(0x180) if chr(c) not in _FNO_KEEP}
 
 
 def _norm_fno(s: str) -> str:
-    return re.sub(r"[^A-Z0-9]", "", (s or "").upper())
+    return (s or "").upper().translate(_FNO_TRANS)
 
 
+# Samme ISO-strenger går igjen på tvers av polling-kall — memoiser
+@lru_cache(maxsize=512)
 def _parse_dt(s: str | None) -> dt.datetime | None:
     if not s:
         return None
@@ -46,24 +198,184 @@ def _parse_dt(s: str | None) -> dt.datetime | None:
 
 
 def _clean_xml_text(text: str) -> str:
-    text = text.lstrip("\ufeff")
+    # BOM fjernes av slettetabellen sammen med de forbudte tegnene
     text = text.replace("\r\n", "\n").replace("\r", "\n")
-    text = _BAD_XML_CHARS.sub("", text)
-    text = _UNESCAPED_AMP.sub("&amp;", text)
+    text = text.translate(_BAD_XML_TRANSLATE)
+    # Velformede feeder har ingen løse '&' — hopp over regex-passet helt
+    if "&" in text:
+        text = _UNESCAPED_AMP.sub("&amp;", text)
     return text.strip()
 
 
+def _extract_flight(fl, fid: str) -> dict:
+    """Plukk feltene API-et bruker ut av ett <flight>-element."""
+    if lxml_etree is not None:
+        status_list = _XP_STATUS(fl)
+        status_el = status_list[0] if status_list else None
+        est_arrival = _XP_EST(fl).strip()
+        sched = _XP_SCHED(fl).strip()
+        airline = _XP_AIRLINE(fl).strip()
+        route = _XP_ROUTE(fl).strip()
+        status_txt = _XP_STATUS_TXT(fl).strip()  # kan være tom
+    else:
+        status_el = fl.find("status")
+        est_arrival = (fl.findtext("est_arrival_time") or "").strip()
+        sched = (fl.findtext("schedule_time") or "").strip()
+        airline = (fl.findtext("airline") or "").strip()
+        route = (fl.findtext("route") or "").strip()
+        status_txt = (fl.findtext("status") or "").strip()  # kan være tom
+
+    # Les status-elementets attributter (kode + tid)
+    status_code = status_time_s = None
+    if status_el is not None:
+        status_code = status_el.attrib.get("code") or None
+        status_time_s = status_el.attrib.get(
+            "time") or None  # ISO, ofte med 'Z'
+
+    # Parse tidene ÉN gang her og bær datetime-objektene med i raden
+    # (underscore-nøkler, jf. _eta_sort_key i avinor-integrasjonen) —
+    # score() og sluttmonteringen slipper å parse ISO-strengene på nytt.
+    sched_dt = _parse_dt(sched)
+    est_dt = _parse_dt(est_arrival)
+
+    # Beste ETA-kilde: status@time (E/A) > est_arrival_time > schedule_time
+    eta_dt = None
+    if status_time_s and (status_code in ("E", "A")):
+        # _parse_dt håndterer 'Z' selv — ingen ekstra replace her
+        eta_dt = _parse_dt(status_time_s)
+    if eta_dt is None:
+        eta_dt = est_dt or sched_dt
+
+    return {
+        "flight": fid,
+        "airline": airline or None,
+        "route": route or None,
+        "status": status_txt or status_code or None,
+        "status_code": status_code,
+        "status_time": status_time_s,
+        "eta_iso": (eta_dt.isoformat() if eta_dt else None),
+        "est_arrival_time": est_arrival or None,
+        "schedule_time": sched or None,
+        "_eta_dt": eta_dt,
+        "_sched_dt": sched_dt,
+        "_est_dt": est_dt,
+    }
+
+
+def _parse_feed(cleaned: str):
+    """Parse hele feeden til et tre.
+
+    Med lxml: ett parse-forsøk med recover=True (libxml2 reparerer selv).
+    Uten: stdlib-parser med dobbel-escape-fallback som før.
+    """
+    if lxml_etree is not None:
+        try:
+            parser = lxml_etree.XMLParser(recover=True,
+                                          huge_tree=False,
+                                          resolve_entities=False)
+            root = lxml_etree.fromstring(cleaned.encode("utf-8"), parser)
+            if root is None:
+                return None, ValueError("tom/ugyldig XML")
+            return root, None
+        except Exception as e:
+            return None, e
+    try:
+        return ET.fromstring(cleaned.encode("utf-8")), None
+    except Exception:
+        hard = _clean_xml_text(cleaned.replace("&", "&amp;"))
+        try:
+            return ET.fromstring(hard.encode("utf-8")), None
+        except Exception as e2:
+            return None, e2
+
+
+def _build_flight_index(text: str) -> dict:
+    """Én strømmende pass over feeden → {normalisert flight_id: [rader]}.
+
+    iterparse + elem.clear() holder minnebruken konstant uansett
+    feed-størrelse; radene er rene dicts (ikke XML-elementer) og kan
+    dermed caches.
+    """
+    index = {}
+    if lxml_etree is not None:
+        # tag-filteret gjør at bare <flight>-elementer leveres ut
+        events = lxml_etree.iterparse(BytesIO(text.encode("utf-8")),
+                                      events=("end", ),
+                                      tag="flight",
+                                      recover=True,
+                                      huge_tree=False,
+                                      resolve_entities=False)
+    else:
+        events = ((e, el)
+                  for e, el in ET.iterparse(BytesIO(text.encode("utf-8")),
+                                            events=("end", ))
+                  if el.tag == "flight")
+    for _event, elem in events:
+        if lxml_etree is not None:
+            fid = _XP_FID(elem).strip()
+        else:
+            fid = (elem.findtext("flight_id") or "").strip()
+        key = _norm_fno(fid)
+        if key:
+            index.setdefault(key, []).append(_extract_flight(elem, fid))
+        elem.clear()
+    return index
+
+
+def _flight_hits_indexed(cleaned: str, params: dict, needle: str):
+    """Slå opp treffene via en cachet flight_id-indeks.
+
+    Indeksen bygges én gang per feed-innhold (fingeravtrykk av XML-en)
+    og caches sammen med feeden — gjentatte oppslag innen TTL er et
+    hash-oppslag uten XML-parsing i det hele tatt.
+    """
+    idx_key = _avinor_feed_key(params) + ":idx"
+    fp = hashlib.md5(cleaned.encode("utf-8")).hexdigest()
+    hit = cache.get(idx_key)
+    if hit is not None and hit[0] == fp:
+        return hit[1].get(needle, []), None
+
+    try:
+        index = _build_flight_index(cleaned)
+    except Exception:
+        try:
+            index = _build_flight_index(
+                _clean_xml_text(cleaned.replace("&", "&amp;")))
+        except Exception as e2:
+            return None, e2
+    cache.set(idx_key, (fp, index), AVINOR_FEED_STALE_TTL)
+    return index.get(needle, []), None
+
+
+def _qint(request, name: str, default: int, lo: int = 0, hi: int = 48) -> int:
+    """Tolerant heltalls-parsing av query-param, med clamping.
+
+    isdigit-sjekken unngår å konstruere ValueError på søppelinput, og
+    lo/hi setter tak så f.eks. hours_to=99999 ikke kan blåse opp
+    upstream-henting.
+    """
+    v = request.query_params.get(name)
+    if v is None:
+        return default
+    v = v.strip()
+    # isdecimal (ikke isdigit — den godtar f.eks. ²) med maks ett
+    # innledende minus; int() skal aldri kunne feile her
+    body = v[1:] if v.startswith("-") else v
+    if not body.isdecimal():
+        return default
+    return max(lo, min(hi, int(v)))
+
+
 # api/views.py (kort test-API)
 class AirArrivalsFR24(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        from .integrations.fr24 import airport_arrivals
         airport = (request.query_params.get("airport")
                    or "SVG").strip().upper()
-        hours_from = int(request.query_params.get("hours_from", "0"))
-        hours_to = int(request.query_params.get("hours_to", "6"))
-        limit = int(request.query_params.get("limit", "100"))
+        hours_from = _qint(request, "hours_from", 0)
+        hours_to = _qint(request, "hours_to", 6)
+        limit = _qint(request, "limit", 100, lo=1, hi=500)
         raw = request.query_params.get("raw")
         try:
             if raw:
@@ -105,12 +417,8 @@ class AirEtaAvinor(APIView):
         if not number:
             return Response({"detail": "number er påkrevd"}, status=400)
 
-        try:
-            hours_from = int(request.query_params.get("hours_from", "0"))
-            hours_to = int(request.query_params.get("hours_to", "12"))
-        except ValueError:
-            return Response({"detail": "hours_from/hours_to må være heltall"},
-                            status=400)
+        hours_from = _qint(request, "hours_from", 0)
+        hours_to = _qint(request, "hours_to", 12)
 
         want_raw = request.query_params.get("raw")
         want_debug = request.query_params.get("debug")
@@ -122,107 +430,45 @@ class AirEtaAvinor(APIView):
             "timeFrom": str(hours_from),
             "timeTo": str(hours_to),
         }
+        # User-Agent ligger på sesjonen; per-kall headers holder seg små
         headers = {
             "Accept": "application/xml,text/xml;q=0.9,*/*;q=0.8",
-            "User-Agent": "transport-backend/1.0",
         }
-        try:
-            r = requests.get(
-                AVINOR_XML,
-                params=params,
-                headers=headers,
-                timeout=15,
-                allow_redirects=False,
-            )
-
-            if 300 <= r.status_code < 400:
-                return Response(
-                    {
-                        "detail": "Avinor svarte med redirect (ikke XML).",
-                        "status": r.status_code,
-                        "location": r.headers.get("Location"),
-                    },
-                    status=502,
-                )
-
-            r.raise_for_status()
-            text = r.text
-
-            ct = (r.headers.get("Content-Type") or "").lower()
-            if "xml" not in ct and not text.lstrip().startswith("<"):
-                return Response(
-                    {
-                        "detail":
-                        "Avinor returnerte ikke XML (mulig HTML/cookie-side).",
-                        "content_type": ct,
-                        "snippet": text[:400],
-                    },
-                    status=502,
-                )
-        except requests.HTTPError as e:
-            return Response({"detail": f"Avinor HTTP: {e}"}, status=502)
-        except Exception as e:
-            return Response({"detail": str(e)}, status=502)
-
-        cleaned = _clean_xml_text(text)
+        # Cache-aside: fersk kopi → ingen HTTP; stale kopi → svar nå og
+        # frisk opp i bakgrunnen; ellers synkron henting som fallback.
+        feed_key = _avinor_feed_key(params)
+        cleaned = cache.get(feed_key)
+        if cleaned is None:
+            stale = cache.get(feed_key + ":stale")
+            if stale is not None:
+                refresh_avinor_feed(params, headers)
+                cleaned = stale
+            else:
+                cleaned, err, err_status = _fetch_avinor_xml(params, headers)
+                if cleaned is None:
+                    return Response(err, status=err_status)
         if want_raw:
-            return Response(cleaned)
-
-        # Parse XML (med fallback)
-        try:
-            root = ET.fromstring(cleaned.encode("utf-8"))
-        except Exception:
-            hard = cleaned.replace("&", "&amp;")
-            hard = _clean_xml_text(hard)
-            try:
-                root = ET.fromstring(hard.encode("utf-8"))
-            except Exception as e2:
-                return Response({"detail": f"Kunne ikke parse XML: {e2}"},
-                                status=502)
+            # rå XML som XML — ikke JSON-pakk en allerede stor streng
+            # (komprimeres av GZipMiddleware på vei ut)
+            return HttpResponse(cleaned, content_type="application/xml")
 
         # Match på flight_id (eksakt, normalisert)
         needle = _norm_fno(number)
-        flights = root.findall(".//flight")
-        hits = []
-        for fl in flights:
-            fid = (fl.findtext("flight_id") or "").strip()
-            if _norm_fno(fid) != needle:
-                continue
-
-            # Les status-elementets attributter (kode + tid)
-            status_el = fl.find("status")
-            status_code = status_time_s = None
-            if status_el is not None:
-                status_code = status_el.attrib.get("code") or None
-                status_time_s = status_el.attrib.get(
-                    "time") or None  # ISO, ofte med 'Z'
-
-            est_arrival = (fl.findtext("est_arrival_time") or "").strip()
-            sched = (fl.findtext("schedule_time") or "").strip()
-            airline = (fl.findtext("airline") or "").strip()
-            route = (fl.findtext("route") or "").strip()
-            status_txt = (fl.findtext("status") or "").strip()  # kan være tom
-
-            # Beste ETA-kilde: status@time (E/A) > est_arrival_time > schedule_time
-            eta_dt = None
-            if status_time_s and (status_code in ("E", "A")):
-                eta_dt = _parse_dt(status_time_s.replace("Z", "+00:00"))
-            if eta_dt is None:
-                eta_dt = _parse_dt(est_arrival) or _parse_dt(sched)
-
-            hits.append({
-                "flight": fid,
-                "airline": airline or None,
-                "route": route or None,
-                "status": status_txt or status_code or None,
-                "status_code": status_code,
-                "status_time": status_time_s,
-                "eta_iso": (eta_dt.isoformat() if eta_dt else None),
-                "est_arrival_time": est_arrival or None,
-                "schedule_time": sched or None,
-            })
 
         if want_debug:
+            # Debug trenger totalantall + sample — materialiser treet bare her
+            root, err = _parse_feed(cleaned)
+            if root is None:
+                return Response({"detail": f"Kunne ikke parse XML: {err}"},
+                                status=502)
+            flights = (_XP_FLIGHTS(root)
+                       if lxml_etree is not None else root.findall(
+                           ".//flight"))
+            hits = [
+                _extract_flight(fl, fid) for fl in flights
+                if _norm_fno(fid := (fl.findtext("flight_id") or "").strip())
+                == needle
+            ]
             sample = [{
                 "flight_id":
                 fl.findtext("flight_id"),
@@ -240,39 +486,53 @@ class AirEtaAvinor(APIView):
                 "total_in_feed": len(flights),
                 "matches": len(hits),
                 "sample": sample,
-                "results": hits,
+                # interne _-nøkler (pre-parsede datetimes) holdes utenfor
+                "results": [{
+                    k: v
+                    for k, v in h.items() if not k.startswith("_")
+                } for h in hits],
             })
 
+        # Vanlig oppslag: O(1) mot cachet flight_id-indeks
+        hits, err = _flight_hits_indexed(cleaned, params, needle)
+        if hits is None:
+            return Response({"detail": f"Kunne ikke parse XML: {err}"},
+                            status=502)
+
         if not hits:
             return Response({"detail": "Ingen treff i Avinor-feed."},
                             status=404)
 
-        # Velg beste: nærmest nå i fremtiden, ellers siste i fortiden (UTC-aware)
+        # Velg beste: nærmest nå i fremtiden, ellers siste i fortiden
+        # (UTC-aware). Datetime-ene ble parset én gang i _extract_flight.
+        now = dt.datetime.now(dt.timezone.utc)
+
         def score(item):
-            eta = _parse_dt(item["eta_iso"]) if item["eta_iso"] else None
+            eta = item["_eta_dt"]
             if not eta:
                 return (1, dt.datetime.max.replace(tzinfo=dt.timezone.utc))
             if eta.tzinfo is None:
                 eta = eta.replace(tzinfo=dt.timezone.utc)
-            now = dt.datetime.now(dt.timezone.utc)
             return (0, eta) if eta >= now else (1, eta)
 
-        picked = sorted(hits, key=score)[0]
+        # min() holder — vi trenger bare den beste, ikke en sortert liste
+        picked = min(hits, key=score)
+
+        # Konverter tider til lokal tid (Europe/Oslo fra Django settings).
+        # Slå opp tidssonen én gang — get_current_timezone går via
+        # thread-local state per kall.
+        tz = timezone.get_current_timezone()
 
-        # Konverter tider til lokal tid (Europe/Oslo fra Django settings)
-        def _to_local(x):
+        def _to_local(x, tz=tz):
             if not x:
                 return None
             if x.tzinfo is None:
                 x = x.replace(tzinfo=dt.timezone.utc)
-            return x.astimezone(timezone.get_current_timezone())
+            return x.astimezone(tz)
 
-        eta_utc = _parse_dt(
-            picked["eta_iso"]) if picked.get("eta_iso") else None
-        sched_utc = _parse_dt(
-            picked["schedule_time"]) if picked.get("schedule_time") else None
-        est_utc = _parse_dt(picked["est_arrival_time"]) if picked.get(
-            "est_arrival_time") else None
+        eta_utc = picked["_eta_dt"]
+        sched_utc = picked["_sched_dt"]
+        est_utc = picked["_est_dt"]
 
         eta_local = _to_local(eta_utc) if eta_utc else None
         sched_local = _to_local(sched_utc) if sched_utc else None
@@ -306,6 +566,47 @@ class AirEtaAvinor(APIView):
         })
 
 
+# Trip-lista caches som rene dicts (pickler 2-3x raskere enn DRF's
+# OrderedDict-baserte ReturnList). Versjonsnøkkelen bumpes ved endringer,
+# så gamle oppføringer blir aldri servert; kort TTL fanger opp
+# bulk-UPDATEs som ikke utløser signaler.
+TRIP_LIST_CACHE_TTL = 30  # sekunder
+
+
+def _trip_list_version() -> int:
+    v = cache.get("trips:list:ver")
+    if v is None:
+        cache.add("trips:list:ver", 1)
+        v = cache.get("trips:list:ver") or 1
+    return v
+
+
+def _bump_trip_list_version(**kwargs):
+    try:
+        cache.incr("trips:list:ver")
+    except ValueError:
+        cache.add("trips:list:ver", 1)
+
+
+post_save.connect(_bump_trip_list_version, sender=Trip)
+post_delete.connect(_bump_trip_list_version, sender=Trip)
+post_save.connect(_bump_trip_list_version, sender=Assignment)
+post_delete.connect(_bump_trip_list_version, sender=Assignment)
+
+
+def _conditional(request, etag, build):
+    """304-håndtering for polling-endepunkter: svar tomt når klientens
+    If-None-Match matcher, ellers bygg svaret og sett ETag +
+    Cache-Control så nettleseren kan korte ned neste runde selv."""
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+    response = build()
+    response["ETag"] = etag
+    response["Cache-Control"] = "private, max-age=5"
+    return response
+
+
 # ---------------- Lokale ViewSets ----------------
 class CustomerViewSet(viewsets.ModelViewSet):
     queryset = Customer.objects.all().order_by('name')
@@ -336,10 +637,26 @@ class LocationViewSet(viewsets.ModelViewSet):
     def search(self, request):
         q = request.query_params.get('q', '').strip()
         qs = self.get_queryset()
+        # .values() hopper over modell-instansiering helt — vi trenger
+        # bare {id, name}-dicts ut
         if q:
-            qs = qs.filter(Q(name__icontains=q) | Q(address__icontains=q))
-        data = [{'id': x.id, 'name': x.name} for x in qs[:20]]
-        return Response(data)
+            # Prefiks-søk først (kan bruke indeks); fall tilbake til
+            # contains på navn/adresse bare når prefikset ikke treffer
+            data = list(
+                qs.filter(name__istartswith=q).values('id', 'name')[:20])
+            if not data:
+                data = list(
+                    qs.filter(Q(name__icontains=q)
+                              | Q(address__icontains=q)).values(
+                                  'id', 'name')[:20])
+        else:
+            data = list(qs.values('id', 'name')[:20])
+        # Location har ikke tidsstempel — hash (id, name)-parene som svak
+        # ETag, så også et navnebytte på samme id-sett invaliderer
+        etag = 'W/"loc-%s"' % hashlib.md5(",".join(
+            "%s:%s" % (d['id'], d['name'])
+            for d in data).encode()).hexdigest()[:16]
+        return _conditional(request, etag, lambda: Response(data))
 
 
 class VehicleViewSet(viewsets.ModelViewSet):
@@ -348,7 +665,8 @@ class VehicleViewSet(viewsets.ModelViewSet):
 
 
 class DriverViewSet(viewsets.ModelViewSet):
-    queryset = Driver.objects.all().order_by('name')
+    # nested UserSerializer — JOIN inn user i stedet for SELECT per sjåfør
+    queryset = Driver.objects.select_related('user').all().order_by('name')
     serializer_class = DriverSerializer
 
 
@@ -358,10 +676,12 @@ class ShiftViewSet(viewsets.ModelViewSet):
 
 
 class TripViewSet(viewsets.ModelViewSet):
-    queryset = Trip.objects.select_related("origin_location",
-                                           "destination_location", "vehicle",
-                                           "customer").all().order_by(
-                                               "date", "start_time")
+    # assignment__driver__user dekker get_current_driver i serializeren —
+    # uten denne koster hver rad i lista to ekstra spørringer.
+    queryset = Trip.objects.select_related(
+        "origin_location", "destination_location", "stop1_location",
+        "stop2_location", "vehicle", "customer", "invoiced_by",
+        "assignment__driver__user").all().order_by("date", "start_time")
     serializer_class = TripSerializer
 
     def get_queryset(self):
@@ -374,16 +694,33 @@ class TripViewSet(viewsets.ModelViewSet):
         customer_id = self.request.query_params.get("customer")
         invoiced_ = self.request.query_params.get("invoiced")
 
+        # Samle alle filtre i én Q og filtrer én gang — hver .filter()
+        # kloner queryset-et (inkl. dypkopi av WHERE-treet), så syv
+        # kjedede kall betalte seks kloner for ingenting.
+        q = Q()
         if status_:
-            qs = qs.filter(status=status_)
+            # API-et bruker fortsatt navnene; oversett til tallverdien.
+            # Ukjent navn skal gi tom liste (som før), ikke ValueError
+            # når strengen treffer heltallskolonnen.
+            status_val = Trip.STATUS_BY_NAME.get(status_)
+            if status_val is None and status_.isdecimal():
+                status_val = int(status_)
+            if status_val is None:
+                return qs.none()
+            q &= Q(status=status_val)
         if date_:
-            qs = qs.filter(date=date_)
+            q &= Q(date=date_)
         if driver_id:
-            qs = qs.filter(assignment__driver_id=driver_id)
+            # EXISTS-semijoin i stedet for JOIN mot Assignment — ingen
+            # raddublering og dermed ingen behov for distinct()
+            q &= Q(
+                Exists(
+                    Assignment.objects.filter(trip_id=OuterRef("pk"),
+                                              driver_id=driver_id)))
         if month_:
             try:
                 year_s, mon_s = month_.split("-", 1)
-                qs = qs.filter(date__year=int(year_s), date__month=int(mon_s))
+                q &= Q(date__year=int(year_s), date__month=int(mon_s))
             except Exception:
                 pass
         if week_:
@@ -392,17 +729,62 @@ class TripViewSet(viewsets.ModelViewSet):
                 y, w = int(y_s), int(w_s)
                 start = _date.fromisocalendar(y, w, 1)
                 end = _date.fromisocalendar(y, w, 7)
-                qs = qs.filter(date__range=(start, end))
+                q &= Q(date__gte=start, date__lte=end)
             except Exception:
                 pass
         if customer_id:
-            qs = qs.filter(customer_id=customer_id)
+            q &= Q(customer_id=customer_id)
         if invoiced_ is not None and invoiced_ != "":
             inv = str(invoiced_).lower() in ("true", "1", "yes", "y", "on")
-            qs = qs.filter(invoiced=inv)
+            q &= Q(invoiced=inv)
 
+        if q:
+            qs = qs.filter(q)
         return qs
 
+    def list(self, request, *args, **kwargs):
+        # Versjonstelleren bumpes ved hver Trip/Assignment-endring, så den
+        # duger som svak ETag — uendrede polls får 304 uten body.
+        version = _trip_list_version()
+
+        def build():
+            # Dict-til-dict: hent radene via .values() og omform med
+            # fast_serializers i stedet for ModelSerializer per rad.
+            key = "trips:list:%d:%s" % (
+                version, urlencode(sorted(request.query_params.items())))
+            data = cache.get(key)
+            if data is None:
+                qs = self.filter_queryset(self.get_queryset())
+                rows = qs.values(*TRIP_LIST_COLUMNS)
+                data = [trip_row_to_dict(r) for r in rows]
+                cache.set(key, data, TRIP_LIST_CACHE_TTL)
+            return Response(data)
+
+        return _conditional(request, 'W/"trips-%d"' % version, build)
+
+    @action(detail=False, methods=["get"])
+    def stats(self, request):
+        """
+        GET /api/trips/stats/ — telling per status, med samme filtre som
+        lista. Én aggregat-spørring mot (date, status)-indeksen og noen
+        titalls bytes svar; dashboards som bare trenger tallene kan polle
+        denne i stedet for hele lista.
+        """
+        version = _trip_list_version()
+
+        def build():
+            qs = self.filter_queryset(self.get_queryset())
+            # order_by() nullstiller default-sorteringen så GROUP BY
+            # ikke drar med date/start_time
+            rows = qs.order_by().values("status").annotate(count=Count("id"))
+            labels = dict(Trip.STATUS_CHOICES)
+            return Response([{
+                "status": labels.get(r["status"], r["status"]),
+                "count": r["count"],
+            } for r in rows])
+
+        return _conditional(request, 'W/"trips-stats-%d"' % version, build)
+
     @action(detail=True, methods=["post"])
     @transaction.atomic
     def assign_driver(self, request, pk=None):
@@ -411,27 +793,85 @@ class TripViewSet(viewsets.ModelViewSet):
         if not driver_id:
             return Response({"detail": "driver_id is required"}, status=400)
         driver = get_object_or_404(Driver, pk=driver_id, active=True)
-        Assignment.objects.update_or_create(
-            trip=trip,
-            defaults={
-                "driver":
-                driver,
-                "assigned_by":
-                request.user if request.user.is_authenticated else None,
-            },
+        # INSERT ... ON CONFLICT DO UPDATE: én spørring i stedet for
+        # SELECT + UPDATE/INSERT
+        Assignment.objects.bulk_create(
+            [
+                Assignment(
+                    trip=trip,
+                    driver=driver,
+                    assigned_by=(request.user
+                                 if request.user.is_authenticated else None),
+                )
+            ],
+            update_conflicts=True,
+            unique_fields=["trip"],
+            update_fields=["driver", "assigned_by"],
         )
-        if trip.status == "unassigned":
-            trip.status = "assigned"
+        if trip.status == Trip.STATUS_UNASSIGNED:
+            trip.status = Trip.STATUS_ASSIGNED
             trip.save(update_fields=["status"])
+        # upserten via bulk_create utløser ikke signaler — invalider
+        # eksplisitt, ellers ser polling aldri sjåførbyttet
+        _bump_trip_list_version()
         return Response({"status": "ok", "trip": trip.id, "driver": driver.id})
 
+    @action(detail=False, methods=["post"], url_path="bulk_assign")
+    @transaction.atomic
+    def bulk_assign(self, request):
+        """
+        POST /api/trips/bulk_assign/  med [{"trip_id": 1, "driver_id": 2}, ...]
+        Tildeler alle i faste spørringer (sjåfør-oppslag, upsert, status)
+        uansett antall — ikke get + update_or_create per rad.
+        """
+        pairs = request.data
+        if isinstance(pairs, dict):
+            pairs = pairs.get("assignments")
+        if not isinstance(pairs, list) or not pairs:
+            return Response(
+                {"detail": "Expected a list of {trip_id, driver_id}."},
+                status=400)
+        try:
+            wanted = {int(p["trip_id"]): int(p["driver_id"]) for p in pairs}
+        except (KeyError, TypeError, ValueError):
+            return Response(
+                {"detail": "Each item needs integer trip_id and driver_id."},
+                status=400)
+
+        drivers = Driver.objects.filter(active=True).in_bulk(
+            set(wanted.values()))
+        unknown = set(wanted.values()) - set(drivers)
+        if unknown:
+            return Response(
+                {"detail": f"Drivers not found or inactive: {sorted(unknown)}"},
+                status=400)
+
+        trip_ids = set(
+            Trip.objects.filter(pk__in=wanted).values_list("id", flat=True))
+        assigned_by = request.user if request.user.is_authenticated else None
+        Assignment.objects.bulk_create(
+            [
+                Assignment(trip_id=tid, driver_id=did, assigned_by=assigned_by)
+                for tid, did in wanted.items() if tid in trip_ids
+            ],
+            update_conflicts=True,
+            unique_fields=["trip"],
+            update_fields=["driver", "assigned_by"],
+        )
+        Trip.objects.filter(pk__in=trip_ids,
+                            status=Trip.STATUS_UNASSIGNED).update(
+                                status=Trip.STATUS_ASSIGNED)
+        # queryset.update() utløser ikke signaler — invalider eksplisitt
+        _bump_trip_list_version()
+        return Response({"status": "ok", "assigned": len(trip_ids)})
+
     @action(detail=True, methods=["post"])
     @transaction.atomic
     def unassign_driver(self, request, pk=None):
         trip = self.get_object()
         Assignment.objects.filter(trip=trip).delete()
-        if trip.status != "unassigned":
-            trip.status = "unassigned"
+        if trip.status != Trip.STATUS_UNASSIGNED:
+            trip.status = Trip.STATUS_UNASSIGNED
             trip.save(update_fields=["status"])
         return Response({"status": "ok", "trip": trip.id})
 
@@ -469,23 +909,30 @@ class TripViewSet(viewsets.ModelViewSet):
         inv = invoiced
         if isinstance(inv, str):
             inv = inv.lower() in ("true", "1", "yes", "y", "on")
-        qs = self.get_queryset().filter(customer_id=customer_id)
         try:
             y_s, m_s = str(month_).split("-", 1)
-            qs = qs.filter(date__year=int(y_s), date__month=int(m_s))
+            y, m = int(y_s), int(m_s)
         except Exception:
             return Response(
                 {"detail": "Invalid 'month' format. Expected 'YYYY-MM'."},
                 status=http_status.HTTP_400_BAD_REQUEST)
+        # Hele WHERE-et i ett filter mot Trip.objects (ikke get_queryset,
+        # som drar med select_related/ordering en UPDATE ikke bruker) —
+        # én UPDATE med indeks-seek på (customer, date)
+        base = Trip.objects.filter(customer_id=customer_id,
+                                   date__year=y,
+                                   date__month=m,
+                                   invoiced=not inv)
         if inv:
-            updated = qs.filter(invoiced=False).update(
-                invoiced=True,
-                invoiced_at=timezone.now(),
-                invoiced_by_id=request.user.id)
+            updated = base.update(invoiced=True,
+                                  invoiced_at=timezone.now(),
+                                  invoiced_by_id=request.user.id)
         else:
-            updated = qs.filter(invoiced=True).update(invoiced=False,
-                                                      invoiced_at=None,
-                                                      invoiced_by_id=None)
+            updated = base.update(invoiced=False,
+                                  invoiced_at=None,
+                                  invoiced_by_id=None)
+        # queryset.update() utløser ikke signaler — invalider eksplisitt
+        _bump_trip_list_version()
         return Response({"status": "ok", "updated": updated})
 
 
@@ -494,6 +941,14 @@ class AssignmentViewSet(viewsets.ModelViewSet):
         'trip', 'driver').all().order_by('-assigned_at')
     serializer_class = AssignmentSerializer
 
+    def list(self, request, *args, **kwargs):
+        # Assignment-endringer bumper samme versjonsteller som Trip-lista
+        etag = 'W/"assignments-%d"' % _trip_list_version()
+        return _conditional(
+            request, etag,
+            lambda: super(AssignmentViewSet, self).list(
+                request, *args, **kwargs))
+
 
 class MeView(APIView):
     permission_classes = [IsAuthenticated]
@@ -28,6 +28,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    # XML/JSON komprimerer 8-10x — stor gevinst på mobile/trege linker
+    "django.middleware.gzip.GZipMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     # Behold CSRF-middleware for admin/browsable API, men API-kall våre bruker JWT og trenger ikke CSRF.
@@ -58,12 +60,33 @@ TEMPLATES = [
 WSGI_APPLICATION = "server.wsgi.application"
 ASGI_APPLICATION = "server.asgi.application"
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+# SQLite serialiserer skrivinger — under samtidige bulk_invoice/assign-kall
+# blokkerer writere hverandre. Sett POSTGRES_DB (+ evt. POSTGRES_USER osv.)
+# for å kjøre mot PostgreSQL med vedvarende, helsesjekkede forbindelser;
+# uten env beholdes SQLite for lokal utvikling.
+if os.getenv("POSTGRES_DB"):
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.getenv("POSTGRES_DB"),
+            "USER": os.getenv("POSTGRES_USER", "postgres"),
+            "PASSWORD": os.getenv("POSTGRES_PASSWORD", ""),
+            "HOST": os.getenv("POSTGRES_HOST", "localhost"),
+            # pgbouncer i transaction-mode lytter typisk på 6432
+            "PORT": os.getenv("POSTGRES_PORT", "5432"),
+            # gjenbruk forbindelser mellom requests i stedet for
+            # connect/disconnect per request
+            "CONN_MAX_AGE": 60,
+            "CONN_HEALTH_CHECKS": True,
+        }
+    }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": BASE_DIR / "db.sqlite3",
+        }
     }
-}
 
 LANGUAGE_CODE = "nb"
 TIME_ZONE = "Europe/Oslo"